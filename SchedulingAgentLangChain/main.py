@@ -1,69 +1,51 @@
 import os.path
+import asyncio
+import sys
 import datetime as dt
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
+from concurrent.futures import ThreadPoolExecutor
 from langchain.agents import tool
-from tzlocal import get_localzone_name
 import os
 from dotenv import load_dotenv
 from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain import hub
-from langchain.agents import create_react_agent, AgentExecutor
+from langchain.agents import create_tool_calling_agent, AgentExecutor
+from langchain.agents.agent import ExceptionTool
+from langchain_core.agents import AgentAction, AgentFinish, AgentStep
+from langchain_core.exceptions import OutputParserException
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 
-# If modifying these SCOPES, delete the file token.json.
-SCOPES = ['https://www.googleapis.com/auth/calendar']
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import scheduling_core as core
+from scheduling_core import DATE_FMT, LOCAL_TZ, LOCAL_TZ_NAME, parse_datetime
+
+TOKEN_PATH = 'SchedulingAgentLangChain/token.json'
+CREDENTIALS_PATH = 'SchedulingAgentLangChain/credentials.json'
 
 def authenticate_google():
-    """Authenticates with Google Calendar API and returns a service object."""
-    creds = None
-    # The file token.json stores the user's access and refresh tokens.
-    if os.path.exists('SchedulingAgentLangChain/token.json'):
-        creds = Credentials.from_authorized_user_file('SchedulingAgentLangChain/token.json', SCOPES)
-    
-    # If there are no (valid) credentials available, let the user log in.
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            # IMPORTANT: Ensure 'credentials.json' is in the same directory
-            flow = InstalledAppFlow.from_client_secrets_file(
-                'SchedulingAgentLangChain/credentials.json', SCOPES)
-            creds = flow.run_local_server(port=0)
-        
-        # Save the credentials for the next run
-        with open('SchedulingAgentLangChain/token.json', 'w') as token:
-            token.write(creds.to_json())
-
-    service = build('calendar', 'v3', credentials=creds)
-    return service
+    """Authenticates with Google Calendar API and returns the shared service object."""
+    # IMPORTANT: Ensure 'credentials.json' is in the same directory
+    return core.get_service(TOKEN_PATH, CREDENTIALS_PATH)
 
 @tool
-def list_upcoming_events():
+async def list_upcoming_events():
     """
     Useful for listing the next 10 upcoming events from the user's primary Google Calendar.
     """
-    service = authenticate_google()
-    now = dt.datetime.utcnow().isoformat() + 'Z'  # 'Z' indicates UTC time
+    service = await asyncio.to_thread(authenticate_google)
     print('--> Getting the upcoming 10 events...')
-    events_result = service.events().list(calendarId='primary', timeMin=now,
-                                          maxResults=10, singleEvents=True,
-                                          orderBy='startTime').execute()
-    events = events_result.get('items', [])
+    events = await asyncio.to_thread(core.list_upcoming_events, service)
 
     if not events:
         return 'No upcoming events found.'
 
     event_list = []
     for event in events:
-        start_str = event['start'].get('dateTime', event['start'].get('date'))
-        event_list.append(f"{start_str} - {event['summary']}")
+        start = event['start']
+        event_list.append(f"{start['dateTime'] if 'dateTime' in start else start['date']} - {event['summary']}")
     
     return "\n".join(event_list)
 
 @tool
-def add_event(summary: str, start_time_str: str, end_time_str: str, description: str = None):
+async def add_event(summary: str, start_time_str: str, end_time_str: str, description: str = None):
     """
     Use this to add a new event to the primary Google Calendar.
 
@@ -73,59 +55,84 @@ def add_event(summary: str, start_time_str: str, end_time_str: str, description:
         end_time_str (str): The end time of the event in ISO format (e.g., YYYY-MM-DDTHH:MM:SS).
         description (str, optional): A description for the event. Defaults to None.
     """
-    service = authenticate_google()
+    service = await asyncio.to_thread(authenticate_google)
     try:
-        local_tz_name = get_localzone_name()
-        start_time = dt.datetime.fromisoformat(start_time_str)
-        end_time = dt.datetime.fromisoformat(end_time_str)
+        # Naive times are local; attach the zone so isoformat() carries an explicit offset.
+        start_time = core.localize(parse_datetime(start_time_str))
+        end_time = core.localize(parse_datetime(end_time_str))
     except ValueError:
         return "Invalid datetime format. Please use ISO format (e.g., YYYY-MM-DDTHH:MM:SS)."
 
     event = {
         'summary': summary,
         'description': description,
-        'start': {'dateTime': start_time.isoformat(), 'timeZone': local_tz_name},
-        'end': {'dateTime': end_time.isoformat(), 'timeZone': local_tz_name},
+        'start': {'dateTime': start_time.isoformat(), 'timeZone': LOCAL_TZ_NAME},
+        'end': {'dateTime': end_time.isoformat(), 'timeZone': LOCAL_TZ_NAME},
     }
     
     try:
-        created_event = service.events().insert(calendarId='primary', body=event).execute()
+        created_event = await asyncio.to_thread(core.insert_event, service, event)
         return f"Event created successfully! View on Google Calendar: {created_event.get('htmlLink')}"
     except Exception as e:
         return f"An error occurred: {e}"
 
 @tool
-def check_schedule_for_day(date: str):
+async def check_schedule_for_day(date: str):
     """
     Checks the schedule for a given day and returns a list of events.
 
     Args:
         date (str): The date to check in YYYY-MM-DD format.
     """
-    service = authenticate_google()
+    service = await asyncio.to_thread(authenticate_google)
+    try:
+        day = dt.datetime.strptime(date, DATE_FMT).date()
+    except ValueError:
+        return "Invalid date format. Please use YYYY-MM-DD."
+
+    time_min, time_max = core.day_bounds(day)
+
+    print(f"--> Getting events for {day.isoformat()}...")
+    events = await asyncio.to_thread(core.list_events, service, time_min, time_max)
+    return _format_day_schedule(day, events)
+
+@tool
+async def check_schedule_for_days(dates: list[str]):
+    """
+    Checks the schedule for several days at once and returns the events for each day.
+    Prefer this over calling check_schedule_for_day repeatedly.
+
+    Args:
+        dates (list[str]): The dates to check, each in YYYY-MM-DD format.
+    """
+    service = await asyncio.to_thread(authenticate_google)
     try:
-        day = dt.datetime.strptime(date, '%Y-%m-%d').date()
+        days = [dt.datetime.strptime(date, DATE_FMT).date() for date in dates]
     except ValueError:
         return "Invalid date format. Please use YYYY-MM-DD."
 
-    local_tz = dt.datetime.now().astimezone().tzinfo
-    time_min = dt.datetime.combine(day, dt.time.min, tzinfo=local_tz).isoformat()
-    time_max = dt.datetime.combine(day, dt.time.max, tzinfo=local_tz).isoformat()
+    print(f"--> Getting events for {len(days)} days...")
+    results = await asyncio.to_thread(core.list_days, service, days)
 
-    print(f"--> Getting events for {day.strftime('%Y-%m-%d')}...")
-    events_result = service.events().list(
-        calendarId='primary', timeMin=time_min, timeMax=time_max, singleEvents=True, orderBy='startTime'
-    ).execute()
-    events = events_result.get('items', [])
+    schedules = []
+    for day in days:
+        events = results[day]
+        if isinstance(events, Exception):
+            schedules.append(f"Could not get events for {day.isoformat()}: {events}")
+        else:
+            schedules.append(_format_day_schedule(day, events))
+    return "\n\n".join(schedules)
 
+def _format_day_schedule(day, events):
+    """Formats the events of a single day for the agent."""
     if not events:
-        return f"You are free on {day.strftime('%Y-%m-%d')}."
+        return f"You are free on {day.isoformat()}."
 
-    event_list = [f"Your schedule for {day.strftime('%Y-%m-%d')}:"]
+    event_list = [f"Your schedule for {day.isoformat()}:"]
     for event in events:
-        start_str = event['start'].get('dateTime', event['start'].get('date'))
-        if 'T' in start_str:
-            start_formatted = dt.datetime.fromisoformat(start_str).strftime('%I:%M %p')
+        start = event['start']
+        if 'dateTime' in start:
+            start_formatted = core.format_time(parse_datetime(start['dateTime']))
         else:
             start_formatted = "All-day"
         event_list.append(f"- {start_formatted}: {event['summary']}")
@@ -133,7 +140,7 @@ def check_schedule_for_day(date: str):
     return "\n".join(event_list)
 
 @tool
-def check_availability(start_time_str: str, end_time_str: str):
+async def check_availability(start_time_str: str, end_time_str: str):
     """
     Finds and returns free slots in the calendar within a given time range.
 
@@ -141,49 +148,156 @@ def check_availability(start_time_str: str, end_time_str: str):
         start_time_str (str): The start of the range in ISO format (e.g., YYYY-MM-DDTHH:MM:SS).
         end_time_str (str): The end of the range in ISO format (e.g., YYYY-MM-DDTHH:MM:SS).
     """
-    service = authenticate_google()
+    service = await asyncio.to_thread(authenticate_google)
     try:
-        start_time = dt.datetime.fromisoformat(start_time_str)
-        end_time = dt.datetime.fromisoformat(end_time_str)
+        # Naive times are local; attach the zone so isoformat() carries an explicit offset.
+        start_time = core.localize(parse_datetime(start_time_str))
+        end_time = core.localize(parse_datetime(end_time_str))
     except ValueError:
         return "Invalid datetime format. Please use ISO format (e.g., YYYY-MM-DDTHH:MM:SS)."
 
     print(f"--> Checking for availability from {start_time} to {end_time}...")
-    events_result = service.events().list(
-        calendarId='primary', timeMin=start_time.isoformat() + 'Z', timeMax=end_time.isoformat() + 'Z',
-        singleEvents=True, orderBy='startTime'
-    ).execute()
-    events = events_result.get('items', [])
+    # The server already merges busy time (and skips all-day/transparent events).
+    try:
+        busy = await asyncio.to_thread(core.query_busy, service, start_time, end_time)
+    except core.FreeBusyError as e:
+        return f"An error occurred: {e}"
 
-    if not events:
+    if not busy:
         return "You are completely free during this period."
 
-    last_event_end = start_time
-    free_slots = []
-    for event in events:
-        event_start_str = event['start'].get('dateTime')
-        if not event_start_str: continue
-        
-        event_start = dt.datetime.fromisoformat(event_start_str).replace(tzinfo=None)
-        if last_event_end < event_start:
-            free_slots.append((last_event_end, event_start))
-        
-        event_end_str = event['end'].get('dateTime')
-        event_end = dt.datetime.fromisoformat(event_end_str).replace(tzinfo=None)
-        last_event_end = max(last_event_end, event_end)
-
-    if last_event_end < end_time:
-        free_slots.append((last_event_end, end_time))
-
+    free_slots = core.free_slots(busy, start_time, end_time, presorted=True)
     if not free_slots:
         return "No free slots found in the specified range."
     
     slot_list = ["You have the following free slots:"]
     for slot_start, slot_end in free_slots:
-        slot_list.append(f"- From {slot_start.strftime('%I:%M %p')} to {slot_end.strftime('%I:%M %p')}")
+        slot_list.append(f"- From {core.format_time(slot_start.astimezone(LOCAL_TZ))} "
+                         f"to {core.format_time(slot_end.astimezone(LOCAL_TZ))}")
+    return "\n".join(slot_list)
+
+@tool
+async def check_availability_multi(dates: list[str]):
+    """
+    Finds free slots on several days at once using a single free/busy lookup.
+    Prefer this over calling check_availability once per day.
+
+    Args:
+        dates (list[str]): The dates to check, each in YYYY-MM-DD format.
+    """
+    service = await asyncio.to_thread(authenticate_google)
+    try:
+        days = sorted({dt.datetime.strptime(date, DATE_FMT).date() for date in dates})
+    except ValueError:
+        return "Invalid date format. Please use YYYY-MM-DD."
+    if not days:
+        return "No dates given."
+
+    print(f"--> Checking availability for {len(days)} days...")
+    try:
+        busy = await asyncio.to_thread(core.query_busy, service, core.day_bounds(days[0])[0],
+                                       core.day_bounds(days[-1])[1])
+    except core.FreeBusyError as e:
+        return f"An error occurred: {e}"
+
+    slot_list = []
+    for day in days:
+        day_start, day_end = core.day_bounds(day)
+        day_busy = [(start, end) for start, end in busy if start < day_end and end > day_start]
+        free_slots = core.free_slots(day_busy, day_start, day_end, presorted=True)
+        slot_list.append(f"{day.isoformat()}:")
+        if not free_slots:
+            slot_list.append("- No free slots")
+        for slot_start, slot_end in free_slots:
+            slot_list.append(f"- From {core.format_time(slot_start)} to {core.format_time(slot_end)}")
     return "\n".join(slot_list)
 
 
+# Read-only tools can safely run side by side; anything else runs serially.
+for _read_only_tool in (list_upcoming_events, check_schedule_for_day, check_schedule_for_days,
+                        check_availability, check_availability_multi):
+    _read_only_tool.metadata = {**(_read_only_tool.metadata or {}), "is_concurrency_safe": True}
+
+
+class ConcurrentAgentExecutor(AgentExecutor):
+    """AgentExecutor that runs the independent tool calls of a single step concurrently."""
+
+    async def _aiter_next_step(self, name_to_tool_map, color_mapping, inputs, intermediate_steps, run_manager=None):
+        try:
+            intermediate_steps = self._prepare_intermediate_steps(intermediate_steps)
+            output = await self._action_agent.aplan(
+                intermediate_steps,
+                callbacks=run_manager.get_child() if run_manager else None,
+                **inputs,
+            )
+        except OutputParserException as e:
+            # Same handling as AgentExecutor: a bad model reply becomes an observation
+            # the model can correct, unless handle_parsing_errors is off.
+            if isinstance(self.handle_parsing_errors, bool):
+                raise_error = not self.handle_parsing_errors
+            else:
+                raise_error = False
+            if raise_error:
+                raise ValueError(
+                    "An output parsing error occurred. "
+                    "In order to pass this error back to the agent and have it try "
+                    "again, pass `handle_parsing_errors=True` to the AgentExecutor. "
+                    f"This is the error: {str(e)}"
+                )
+            text = str(e)
+            if isinstance(self.handle_parsing_errors, bool):
+                if e.send_to_llm:
+                    observation = str(e.observation)
+                    text = str(e.llm_output)
+                else:
+                    observation = "Invalid or incomplete response"
+            elif isinstance(self.handle_parsing_errors, str):
+                observation = self.handle_parsing_errors
+            elif callable(self.handle_parsing_errors):
+                observation = self.handle_parsing_errors(e)
+            else:
+                raise ValueError("Got unexpected type of `handle_parsing_errors`")
+            output = AgentAction("_Exception", observation, text)
+            observation = await ExceptionTool().arun(
+                output.tool_input,
+                verbose=self.verbose,
+                color=None,
+                callbacks=run_manager.get_child() if run_manager else None,
+                **self._action_agent.tool_run_logging_kwargs(),
+            )
+            yield AgentStep(action=output, observation=observation)
+            return
+
+        if isinstance(output, AgentFinish):
+            yield output
+            return
+
+        actions = [output] if isinstance(output, AgentAction) else output
+        for agent_action in actions:
+            yield agent_action
+
+        async def perform(agent_action):
+            return await self._aperform_agent_action(name_to_tool_map, color_mapping, agent_action, run_manager)
+
+        # Index results by position so observations come back in the order the model asked.
+        results = [None] * len(actions)
+        safe, unsafe = [], []
+        for i, agent_action in enumerate(actions):
+            selected_tool = name_to_tool_map.get(agent_action.tool)
+            if selected_tool and (selected_tool.metadata or {}).get("is_concurrency_safe"):
+                safe.append(i)
+            else:
+                unsafe.append(i)
+
+        for i, step in zip(safe, await asyncio.gather(*(perform(actions[i]) for i in safe))):
+            results[i] = step
+        # Writes (e.g. add_event) run after the reads, one at a time.
+        for i in unsafe:
+            results[i] = await perform(actions[i])
+
+        for step in results:
+            yield step
+
 def main():
     """Main entry point for the LangChain scheduling agent."""
     load_dotenv()
@@ -196,16 +310,39 @@ def main():
     authenticate_google()
     print("Authentication successful. Welcome to your LangChain Scheduling Agent!")
     
-    tools = [list_upcoming_events, add_event, check_schedule_for_day, check_availability]
+    tools = [list_upcoming_events, add_event, check_schedule_for_day, check_schedule_for_days,
+             check_availability, check_availability_multi]
     llm = ChatGoogleGenerativeAI(model="gemini-1.5-flash", temperature=0)
-    prompt = hub.pull("hwchase17/react")
-    agent = create_react_agent(llm, tools, prompt)
-    agent_executor = AgentExecutor(agent=agent, tools=tools, verbose=True)
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", "You are a helpful assistant that manages the user's Google Calendar. "
+                   "The current time is {current_time}. "
+                   "When a request needs several independent lookups, call all of the tools "
+                   "in the same turn instead of one at a time."),
+        ("human", "{input}"),
+        MessagesPlaceholder("agent_scratchpad"),
+    ])
+    # Gemini can already return several tool calls in one response (its default
+    # function calling mode); the prompt asks it to, and ConcurrentAgentExecutor
+    # then runs them side by side.
+    agent = create_tool_calling_agent(llm, tools, prompt)
+    agent_executor = ConcurrentAgentExecutor(agent=agent, tools=tools, verbose=True)
 
     print("You can now ask me to manage your calendar. Type 'exit' or 'quit' to leave.")
+    try:
+        asyncio.run(_chat(agent_executor))
+    except KeyboardInterrupt:
+        # Ctrl+C while a turn is running cancels the loop rather than reaching _chat.
+        print("\nGoodbye!")
+
+
+async def _chat(agent_executor):
+    """Runs the REPL on an event loop so independent tool calls overlap."""
+    # Blocking Google API calls run on this pool; size it so a whole step's calls fit.
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=10))
 
     while True:
         try:
+            # Nothing else runs on the loop between turns, so a blocking prompt is fine.
             user_input = input("\n> ")
             if user_input.lower() in ['exit', 'quit']:
                 print("Goodbye!")
@@ -214,8 +351,15 @@ def main():
             if not user_input:
                 continue
 
-            result = agent_executor.invoke({"input": user_input})
-            print(f"\n{result.get('output')}")
+            # Stream each agent step as it completes instead of waiting for the whole chain.
+            # Action/observation chunks are already echoed by verbose mode; only the final
+            # chunk carries the answer.
+            # The current time is filled in per turn so relative dates stay right in a long session.
+            turn = {"input": user_input, "current_time": dt.datetime.now(LOCAL_TZ).isoformat()}
+            async for chunk in agent_executor.astream(turn):
+                if "output" in chunk:
+                    sys.stdout.write(f"\n{chunk['output']}\n")
+                    sys.stdout.flush()
 
         except KeyboardInterrupt:
             print("\nGoodbye!")
@@ -1,28 +1,32 @@
 import os.path
 import datetime as dt
 import os
+import re
 import json
 import sys
-from tzlocal import get_localzone_name
+import functools
 from dotenv import load_dotenv
 import google.generativeai as genai
 import dateparser
 
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
 # Add tracking
 sys.path.append('..')
 from Tracking import start_session, end_session, get_session_summary
 from Tracking.display import display_session_summary
 from Tracking.decorators import track_function, track_llm, track_api
 
-
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
+import scheduling_core as core
+from scheduling_core import DATE_FMT, LOCAL_TZ, LOCAL_TZ_NAME, parse_datetime
 
 
-# If modifying these SCOPES, delete the file token.json.
-SCOPES = ['https://www.googleapis.com/auth/calendar']
+TOKEN_PATH = '../SchedulingAgentRaw/token.json'
+CREDENTIALS_PATH = '../SchedulingAgentRaw/credentials.json'
 
 
 def _execute_google_api_call(request, endpoint: str):
@@ -30,46 +34,23 @@ def _execute_google_api_call(request, endpoint: str):
     # A simple wrapper to apply a decorator dynamically.
     @track_api(api_name="google_calendar", endpoint=endpoint)
     def executor():
-        return request.execute()
+        return core.execute(request)
     return executor()
 
 
 @track_function
 def authenticate_google():
-    """Shows basic usage of the Google Calendar API.
-    Prints the start and name of the next 10 events on the user's calendar.
-    """
-    creds = None
+    """Authenticates with the Google Calendar API and returns the shared service object."""
     # The file token.json stores the user's access and refresh tokens, and is
     # created automatically when the authorization flow completes for the first time.
+    return core.get_service(TOKEN_PATH, CREDENTIALS_PATH)
 
-    if os.path.exists('../SchedulingAgentRaw/token.json'):
-        creds = Credentials.from_authorized_user_file('../SchedulingAgentRaw/token.json', SCOPES)
-    # If there are no (valid) credentials available, let the user log in.
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            flow = InstalledAppFlow.from_client_secrets_file(
-                '../SchedulingAgentRaw/credentials.json', SCOPES)
-            creds = flow.run_local_server(port=0)
-        # Save the credentials for the next run
-        with open('../SchedulingAgentRaw/token.json', 'w') as token:
-            token.write(creds.to_json())
-
-    service = build('calendar', 'v3', credentials=creds)
-    return service
 
 @track_function
 def list_upcoming_events(service):
     """Lists the next 10 upcoming events from the user's primary calendar."""
-    now = dt.datetime.utcnow().isoformat() + 'Z'  # 'Z' indicates UTC time
     print('Getting the upcoming 10 events')
-    events_request = service.events().list(calendarId='primary', timeMin=now,
-                                          maxResults=10, singleEvents=True,
-                                          orderBy='startTime')
-    events_result = _execute_google_api_call(events_request, "events.list")
-    events = events_result.get('items', [])
+    events = core.list_upcoming_events(service, executor=_execute_google_api_call)
 
     if not events:
         print('No upcoming events found.')
@@ -77,13 +58,12 @@ def list_upcoming_events(service):
 
     # Prints the start and name of the next 10 events
     for event in events:
-        start_str = event['start'].get('dateTime', event['start'].get('date'))
-        
-        if 'T' in start_str:  # It's a dateTime
-            event_dt = dt.datetime.fromisoformat(start_str)
-            start_formatted = event_dt.strftime('%Y-%m-%d %I:%M %p')
+        start = event['start']
+
+        if 'dateTime' in start:  # It's a timed event
+            start_formatted = core.format_datetime(parse_datetime(start['dateTime']))
         else:  # It's an all-day event
-            start_formatted = start_str
+            start_formatted = start['date']
 
         print(f"{start_formatted} - {event['summary']}")
 
@@ -92,39 +72,28 @@ def check_schedule_for_day(service, date_str=None):
     """Checks the schedule for a given day and prints the events."""
     if date_str:
         try:
-            day = dt.datetime.strptime(date_str, '%Y-%m-%d').date()
+            day = dt.datetime.strptime(date_str, DATE_FMT).date()
         except ValueError:
             print("Invalid date format. Please use YYYY-MM-DD.")
             return
     else:
         day = dt.date.today()
 
-    local_tz = dt.datetime.now().astimezone().tzinfo
-    time_min = dt.datetime.combine(day, dt.time.min, tzinfo=local_tz).isoformat()
-    time_max = dt.datetime.combine(day, dt.time.max, tzinfo=local_tz).isoformat()
-
-    print(f"Getting events for {day.strftime('%Y-%m-%d')}...")
-    events_request = service.events().list(
-        calendarId='primary',
-        timeMin=time_min,
-        timeMax=time_max,
-        singleEvents=True,
-        orderBy='startTime'
-    )
-    events_result = _execute_google_api_call(events_request, "events.list")
-    events = events_result.get('items', [])
+    time_min, time_max = core.day_bounds(day)
+
+    print(f"Getting events for {day.isoformat()}...")
+    events = core.list_events(service, time_min, time_max, executor=_execute_google_api_call)
 
     if not events:
-        print(f"You are free on {day.strftime('%Y-%m-%d')}.")
+        print(f"You are free on {day.isoformat()}.")
         return
 
-    print(f"Your schedule for {day.strftime('%Y-%m-%d')}:")
+    print(f"Your schedule for {day.isoformat()}:")
     for event in events:
-        start_str = event['start'].get('dateTime', event['start'].get('date'))
-        
-        if 'T' in start_str:  # It's a dateTime
-            event_time = dt.datetime.fromisoformat(start_str)
-            start_formatted = event_time.strftime('%I:%M %p')
+        start = event['start']
+
+        if 'dateTime' in start:  # It's a timed event
+            start_formatted = core.format_time(parse_datetime(start['dateTime']))
         else:  # It's an all-day event
             start_formatted = "All-day"
 
@@ -134,12 +103,9 @@ def check_schedule_for_day(service, date_str=None):
 def add_event(service, summary, start_time_str, end_time_str, description=None):
     """Adds a new event to the primary calendar."""
     try:
-        # Get the local timezone name
-        local_tz_name = get_localzone_name()
-        
-        # Parse start and end times from isoformat string
-        start_time = dt.datetime.fromisoformat(start_time_str)
-        end_time = dt.datetime.fromisoformat(end_time_str)
+        # Parse start and end times from isoformat string. Naive times are local; attach the zone so isoformat() carries an explicit offset.
+        start_time = core.localize(parse_datetime(start_time_str))
+        end_time = core.localize(parse_datetime(end_time_str))
 
     except ValueError:
         print("Invalid datetime format. Please use ISO format (e.g., YYYY-MM-DDTHH:MM:SS).")
@@ -150,17 +116,16 @@ def add_event(service, summary, start_time_str, end_time_str, description=None):
         'description': description,
         'start': {
             'dateTime': start_time.isoformat(),
-            'timeZone': local_tz_name,
+            'timeZone': LOCAL_TZ_NAME,
         },
         'end': {
             'dateTime': end_time.isoformat(),
-            'timeZone': local_tz_name,
+            'timeZone': LOCAL_TZ_NAME,
         },
     }
 
     try:
-        insert_request = service.events().insert(calendarId='primary', body=event)
-        created_event = _execute_google_api_call(insert_request, "events.insert")
+        created_event = core.insert_event(service, event, executor=_execute_google_api_call)
         print(f"Event created successfully!")
         print(f"View on Google Calendar: {created_event.get('htmlLink')}")
     except Exception as e:
@@ -171,78 +136,42 @@ def add_event(service, summary, start_time_str, end_time_str, description=None):
 def check_availability(service, start_str, end_str):
     """Finds and prints free slots in the calendar within a given time range."""
     try:
-        local_tz_name = get_localzone_name()
-        start_time = dt.datetime.fromisoformat(start_str)
-        end_time = dt.datetime.fromisoformat(end_str)
+        # Treat times without an offset as local time rather than UTC.
+        start_time = core.localize(parse_datetime(start_str))
+        end_time = core.localize(parse_datetime(end_str))
     except ValueError:
         print("Invalid datetime format. Please use ISO format (e.g., YYYY-MM-DDTHH:MM:SS).")
         return
 
     print(f"Checking for availability from {start_time} to {end_time}...")
 
-    events_request = service.events().list(
-        calendarId='primary',
-        timeMin=start_time.isoformat() + 'Z',
-        timeMax=end_time.isoformat() + 'Z',
-        singleEvents=True,
-        orderBy='startTime'
-    )
-    events_result = _execute_google_api_call(events_request, "events.list")
-    events = events_result.get('items', [])
+    # The server already merges busy time (and skips all-day/transparent events).
+    try:
+        busy = core.query_busy(service, start_time, end_time, executor=_execute_google_api_call)
+    except core.FreeBusyError as e:
+        print(f"An error occurred: {e}")
+        return
 
-    if not events:
+    if not busy:
         print("You are completely free during this period.")
         return
 
-    last_event_end = start_time
-    free_slots = []
-
-    for event in events:
-        event_start_str = event['start'].get('dateTime')
-        if not event_start_str:  # Skip all-day events
-            continue
-        
-        event_start = dt.datetime.fromisoformat(event_start_str).replace(tzinfo=None)
-
-        if last_event_end < event_start:
-            free_slots.append((last_event_end, event_start))
-        
-        event_end_str = event['end'].get('dateTime')
-        event_end = dt.datetime.fromisoformat(event_end_str).replace(tzinfo=None)
-        last_event_end = max(last_event_end, event_end)
-
-    if last_event_end < end_time:
-        free_slots.append((last_event_end, end_time))
+    free_slots = core.free_slots(busy, start_time, end_time, presorted=True)
 
     if not free_slots:
         print("No free slots found in the specified range.")
     else:
         print("You have the following free slots:")
         for slot_start, slot_end in free_slots:
-            print(f"- From {slot_start.strftime('%Y-%m-%d %I:%M %p')} to {slot_end.strftime('%Y-%m-%d %I:%M %p')}")
-
-
-@track_llm
-def _generate_gemini_response(service, model, prompt, user_input):
-    """Generates content using the Gemini model and is tracked."""
-    return model.generate_content(prompt)
+            print(f"- From {core.format_datetime(slot_start.astimezone(LOCAL_TZ))} "
+                  f"to {core.format_datetime(slot_end.astimezone(LOCAL_TZ))}")
 
 
-@track_function
-def LLM_to_function_call(service, user_input):
-    """Uses an LLM to parse a natural language command and execute the corresponding function."""
-    load_dotenv()
-    api_key = os.getenv("GEMINI_API_KEY")
-    if not api_key:
-        print("Error: GEMINI_API_KEY not found. Please create a .env file with your key.")
-        return
-    genai.configure(api_key=api_key)
-    model = genai.GenerativeModel('gemini-2.0-flash')
+# Matches the ```json ... ``` fence the model sometimes wraps its answer in.
+_CODE_FENCE = re.compile(r'^\s*```(?:json)?\s*|\s*```\s*$', re.M)
 
-    # We provide the current time to give the LLM context for relative dates like "tomorrow".
-    current_time = dt.datetime.now().isoformat()
-
-    prompt = f"""
+# Filled in with str.format on every request; literal braces in the example are doubled.
+PROMPT_TEMPLATE = """
     You are a helpful assistant that translates natural language commands into structured JSON function calls for a Google Calendar agent.
     The current time is {current_time}.
     Analyze the user's request and determine which of the available functions should be called and what parameters to use.
@@ -265,6 +194,7 @@ def LLM_to_function_call(service, user_input):
     Based on the request, output a single JSON object with two keys:
     - "function_name": The name of the function to call (e.g., "add_event").
     - "parameters": A dictionary of the arguments for that function.
+    If the request needs several function calls (e.g., checking more than one day), output a JSON array of such objects instead.
 
     Example for "add meeting tomorrow at 2pm for 1 hour":
     {{
@@ -281,29 +211,111 @@ def LLM_to_function_call(service, user_input):
     Now, generate the JSON for the user's request above.
     """
 
+
+@functools.lru_cache(maxsize=1)
+def _get_model():
+    """Loads the API key and builds the Gemini model once; returns None if no key is set."""
+    load_dotenv()
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        return None
+    genai.configure(api_key=api_key)
+    return genai.GenerativeModel('gemini-2.0-flash')
+
+
+@track_llm
+def _generate_gemini_response(service, model, prompt, user_input):
+    """Generates content using the Gemini model and is tracked."""
+    return model.generate_content(prompt)
+
+
+# Maps each function name the LLM can return to a handler taking (service, parameters).
+_FUNCTION_HANDLERS = {
+    "add_event": lambda service, parameters: add_event(service, **parameters),
+    # dateparser is more robust for the LLM's potential output
+    "check_schedule_for_day": lambda service, parameters: check_schedule_for_day(
+        service, dateparser.parse(parameters.get("date")).strftime(DATE_FMT)),
+    "check_availability": lambda service, parameters: check_availability(
+        service, parameters.get("start_time"), parameters.get("end_time")),
+    "list_upcoming_events": lambda service, parameters: list_upcoming_events(service),
+}
+
+
+def _fetch_days_checked(fetch, days):
+    """Runs fetch(days), raising if any day failed so the tracked call reports the failure."""
+    results = fetch(days)
+    failed = [day.strftime(DATE_FMT) for day, events in results.items() if isinstance(events, Exception)]
+    if failed:
+        raise RuntimeError(f"Could not prefetch {len(failed)} of {len(results)} days: {', '.join(failed)}")
+    return results
+
+
+def _prefetch_days(service, calls):
+    """Loads every day the read-only calls will look at into the cache in a single round trip."""
+    days = set()
+    for call in calls:
+        parameters = call.get("parameters") or {}
+        try:
+            # check_availability asks the freebusy endpoint instead of reading cached days.
+            if call.get("function_name") == "check_schedule_for_day":
+                days.add(dateparser.parse(parameters.get("date")).date())
+        except (TypeError, ValueError, AttributeError):
+            # The call itself reports bad parameters when it runs.
+            continue
+
+    # Today is always re-fetched when it is read, so prefetching it would be wasted.
+    days.discard(dt.datetime.now(LOCAL_TZ).date())
+
+    if len(days) > 1:
+        try:
+            if core.HAS_AIOHTTP:
+                # Fan the days out as concurrent requests; tracked as a single API call.
+                track_api(api_name="google_calendar", endpoint="events.list")(_fetch_days_checked)(
+                    core.fetch_days_sync, sorted(days))
+            else:
+                _fetch_days_checked(
+                    functools.partial(core.list_days, service, executor=_execute_google_api_call), sorted(days))
+        except RuntimeError as e:
+            # Not fatal: each call fetches (and reports on) its own day when it runs.
+            print(f"Note: {e}")
+
+
+@track_function
+def LLM_to_function_call(service, user_input):
+    """Uses an LLM to parse a natural language command and execute the corresponding function."""
+    model = _get_model()
+    if model is None:
+        print("Error: GEMINI_API_KEY not found. Please create a .env file with your key.")
+        return
+
+    # We provide the current time to give the LLM context for relative dates like "tomorrow".
+    current_time = dt.datetime.now().isoformat()
+
+    prompt = PROMPT_TEMPLATE.format(current_time=current_time, user_input=user_input)
+
     try:
         response = _generate_gemini_response(service, model, prompt, user_input=user_input)
         # Clean up the response from the LLM, which might be wrapped in ```json ... ```
-        cleaned_response = response.text.strip().replace('```json', '').replace('```', '').strip()
-        
-        parsed_command = json.loads(cleaned_response)
-        function_name = parsed_command.get("function_name")
-        parameters = parsed_command.get("parameters", {})
-
-        print(f"LLM interpretation: Calling function '{function_name}' with parameters: {parameters}")
-
-        if function_name == "add_event":
-            add_event(service, **parameters)
-        elif function_name == "check_schedule_for_day":
-            # dateparser is more robust for the LLM's potential output
-            parsed_date = dateparser.parse(parameters.get("date")).strftime('%Y-%m-%d')
-            check_schedule_for_day(service, parsed_date)
-        elif function_name == "check_availability":
-            check_availability(service, parameters.get("start_time"), parameters.get("end_time"))
-        elif function_name == "list_upcoming_events":
-            list_upcoming_events(service)
-        else:
-            print(f"Unknown command: {function_name}")
+        cleaned_response = _CODE_FENCE.sub('', response.text)
+
+        # orjson.JSONDecodeError subclasses json.JSONDecodeError, so the handler below covers both.
+        parsed_command = _json_loads(cleaned_response)
+        calls = parsed_command if isinstance(parsed_command, list) else [parsed_command]
+
+        if len(calls) > 1:
+            _prefetch_days(service, calls)
+
+        for call in calls:
+            function_name = call.get("function_name")
+            parameters = call.get("parameters", {})
+
+            print(f"LLM interpretation: Calling function '{function_name}' with parameters: {parameters}")
+
+            handler = _FUNCTION_HANDLERS.get(function_name)
+            if handler is None:
+                print(f"Unknown command: {function_name}")
+            else:
+                handler(service, parameters)
 
     except (json.JSONDecodeError, AttributeError, KeyError) as e:
         print(f"Could not understand the command. Please try rephrasing. Error: {e}")
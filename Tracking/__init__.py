@@ -27,6 +27,13 @@ from .events import (
     get_session_summary
 )
 
+from .decorators import (
+    track_function,
+    track_llm,
+    track_api,
+    rebind_all
+)
+
 __version__ = "0.1.0"
 __author__ = "Agent Developer"
 
@@ -40,6 +47,9 @@ __all__ = [
     "EventType", "start_session", "end_session", "emit_event",
     "get_session_events", "get_session_summary",
     
+    # Decorators
+    "track_function", "track_llm", "track_api", "rebind_all",
+    
     # Event types
     "BaseEvent", "SessionEvent", "FunctionCallEvent", 
     "LLMCallEvent", "APICallEvent", "ErrorEvent"
@@ -0,0 +1,123 @@
+"""
+Background delivery of tracking events to the CLI, file and webhook sinks
+"""
+import sys
+import json
+import queue
+import atexit
+import threading
+from dataclasses import asdict
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+from .config import tracking_config, TrackingMode
+
+if TYPE_CHECKING:
+    from .events import BaseEvent
+
+# Up to this many queued events are written or POSTed together.
+BATCH_SIZE = 50
+# How long the exit hook waits for queued events to be delivered.
+FLUSH_TIMEOUT_SECONDS = 5.0
+
+_QUEUE: "queue.SimpleQueue" = queue.SimpleQueue()
+_worker: Optional[threading.Thread] = None
+_worker_lock = threading.Lock()
+# Keep-alive HTTP session for the webhook, created on first use.
+_session = None
+
+
+def _to_record(event: "BaseEvent") -> Dict[str, Any]:
+    """Converts an event to a JSON-serializable dict"""
+    record = asdict(event)
+    record["event_type"] = event.event_type.value
+    record["timestamp"] = event.timestamp.isoformat()
+    return record
+
+
+def _write_file(events: List["BaseEvent"]):
+    """Appends events to the log file as JSON lines"""
+    if not tracking_config.log_file_path:
+        return
+    lines = "".join(json.dumps(_to_record(event), default=str) + "\n" for event in events)
+    with open(tracking_config.log_file_path, "a", encoding="utf-8") as log_file:
+        log_file.write(lines)
+
+
+def _post_webhook(events: List["BaseEvent"]):
+    """Sends events to the webhook as a single JSON array"""
+    global _session
+    if not tracking_config.webhook_url:
+        return
+    if _session is None:
+        import requests
+        _session = requests.Session()
+    payload = json.dumps([_to_record(event) for event in events], default=str)
+    _session.post(tracking_config.webhook_url, data=payload,
+                  headers={"Content-Type": "application/json"}, timeout=10)
+
+
+def _deliver(events: List["BaseEvent"]):
+    """Sends a batch of events to the sink for the current tracking mode"""
+    try:
+        if tracking_config.mode == TrackingMode.CLI:
+            # Imported here because display imports events, which imports this module
+            from .display import display_events
+            display_events(events)
+        elif tracking_config.mode == TrackingMode.FILE:
+            _write_file(events)
+        elif tracking_config.mode == TrackingMode.WEBHOOK:
+            _post_webhook(events)
+    except Exception as e:
+        # Tracking must never take the agent down; drop the batch and carry on.
+        print(f"Tracking: could not deliver {len(events)} events: {e}", file=sys.stderr)
+
+
+def _run():
+    """Worker loop: drains the queue in batches until the process exits"""
+    while True:
+        batch = []
+        flushed = []
+        item = _QUEUE.get()
+        while True:
+            if isinstance(item, threading.Event):
+                flushed.append(item)
+            else:
+                batch.append(item)
+            if len(batch) >= BATCH_SIZE:
+                break
+            try:
+                item = _QUEUE.get_nowait()
+            except queue.Empty:
+                break
+        if batch:
+            _deliver(batch)
+        for done in flushed:
+            done.set()
+
+
+def _ensure_worker():
+    """Starts the daemon worker thread on first use"""
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_run, name="tracking-sink", daemon=True)
+            _worker.start()
+
+
+def enqueue(event: "BaseEvent"):
+    """Queues an event for background delivery; never blocks the caller"""
+    if _worker is None:
+        _ensure_worker()
+    _QUEUE.put_nowait(event)
+
+
+def flush(timeout: float = FLUSH_TIMEOUT_SECONDS) -> bool:
+    """Waits until every event queued so far has been delivered"""
+    if _worker is None:
+        return True
+    done = threading.Event()
+    _QUEUE.put_nowait(done)
+    return done.wait(timeout)
+
+
+atexit.register(flush)
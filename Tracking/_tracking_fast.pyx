@@ -0,0 +1,98 @@
+# cython: language_level=3
+"""
+Optional compiled implementation of track_function.
+
+Build in place with `cythonize -i Tracking/_tracking_fast.pyx`; without it,
+decorators.py uses its pure-Python implementation.
+"""
+import types
+
+# The monotonic nanosecond clock behind time.perf_counter_ns(), without the int
+# object. Declared here rather than cimported from cpython.time, which only has
+# it from Cython 3.1; CPython made it public (and renamed it) in 3.13.
+cdef extern from *:
+    """
+    #if PY_VERSION_HEX >= 0x030D0000
+    static long long _tracking_perf_counter_ns(void) { return (long long)PyTime_PerfCounterRaw(); }
+    #else
+    static long long _tracking_perf_counter_ns(void) { return (long long)_PyTime_GetPerfCounter(); }
+    #endif
+    """
+    long long PyTime_PerfCounterRaw "_tracking_perf_counter_ns"() nogil
+
+from . import config as _config
+from .events import emit_event, new_event, FunctionCallEvent
+
+
+cdef class TrackedFunction:
+    """
+    Installed in place of a track_function-decorated function. Like the Python
+    wrapper built by decorators._dispatch, it only re-reads the configuration
+    when config_version changes.
+    """
+    cdef object func
+    cdef str function_name
+    cdef object is_verbose
+    cdef object capture_params
+    cdef object no_params
+    cdef object short_repr
+    cdef long long version
+    cdef bint enabled
+    cdef bint verbose
+    # Holds the attributes functools.update_wrapper copies from func
+    cdef dict __dict__
+
+    def __init__(self, func, str function_name, is_verbose, capture_params, no_params, short_repr):
+        self.func = func
+        self.function_name = function_name
+        # Passed in by decorators.py, which imports this module
+        self.is_verbose = is_verbose
+        self.capture_params = capture_params
+        self.no_params = no_params
+        self.short_repr = short_repr
+        self.version = -1
+
+    def __get__(self, instance, owner):
+        # Bind like a plain function when used as a method
+        if instance is None:
+            return self
+        return types.MethodType(self, instance)
+
+    def __call__(self, *args, **kwargs):
+        cdef long long version = _config.config_version
+        if self.version != version:
+            self.version = version
+            self.enabled = _config._ENABLED
+            self.verbose = self.enabled and self.is_verbose()
+        if not self.enabled:
+            return self.func(*args, **kwargs)
+
+        cdef long long start_ns = PyTime_PerfCounterRaw()
+        cdef object error = None
+        cdef object return_value = None
+
+        try:
+            return_value = self.func(*args, **kwargs)
+            return return_value
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self._emit(PyTime_PerfCounterRaw() - start_ns, args, kwargs, return_value, error)
+
+    cdef _emit(self, long long execution_time_ns, tuple args, dict kwargs, object return_value, object error):
+        params_to_log = self.no_params
+        return_value_repr = None
+        if self.verbose:
+            params_to_log = self.capture_params(args, kwargs)
+            if error is None and return_value is not None:
+                return_value_repr = self.short_repr.repr(return_value)
+
+        emit_event(new_event(FunctionCallEvent,
+            function_name=self.function_name,
+            parameters=params_to_log,
+            execution_time_ns=execution_time_ns,
+            success=error is None,
+            return_value=return_value_repr,
+            error_message=str(error) if error is not None else None
+        ))
@@ -1,6 +1,7 @@
 """
 Tracking configuration settings
 """
+import sys
 from enum import Enum
 from dataclasses import dataclass
 from typing import Optional
@@ -16,7 +17,7 @@ class DisplayLevel(Enum):
     NORMAL = "normal"    # Function calls and LLM calls
     VERBOSE = "verbose"  # Everything including detailed parameters
 
-@dataclass
+@dataclass(slots=True)
 class TrackingConfig:
     """Configuration for the tracking system"""
     mode: TrackingMode = TrackingMode.CLI
@@ -24,8 +25,18 @@ class TrackingConfig:
     show_parameters: bool = True
     show_execution_time: bool = True
     show_timestamps: bool = True
+    # Print CLI events from the background writer thread in batches instead of inline.
+    # Off by default: lines can then land after the agent's own output or input prompt.
+    background_display: bool = False
     webhook_url: Optional[str] = None
     log_file_path: Optional[str] = None
+    # Estimate LLM tokens as characters / 4 instead of counting words
+    fast_token_estimate: bool = True
+    # Most events kept in memory per session; older ones are dropped (summaries still count them)
+    buffer_size: int = 10_000
+    # Reuse call events evicted from the full buffer for new ones (CLI inline output only).
+    # Off by default: events returned by get_session_events() may then change under you.
+    reuse_events: bool = False
     
     # Color settings for CLI
     use_colors: bool = True
@@ -35,12 +46,42 @@ class TrackingConfig:
     api_color: str = "yellow"
     error_color: str = "red"
 
+    def __setattr__(self, name, value):
+        """Keeps the cached mode flags and config_version in sync with every change"""
+        global _ENABLED, _CLI_DISPLAY, config_version
+        object.__setattr__(self, name, value)
+        # Once loaded, display caches state derived from the config
+        display = sys.modules.get(__package__ + ".display")
+        if name == "mode":
+            _ENABLED = value != TrackingMode.DISABLED
+            _CLI_DISPLAY = value == TrackingMode.CLI
+            # display_event is rebound for the new mode
+            if display is not None:
+                display._set_mode(value)
+            # and decorated functions are swapped between their wrappers and the raw functions
+            decorators = sys.modules.get(__package__ + ".decorators")
+            if decorators is not None:
+                decorators.rebind_all()
+        elif display is not None and (name == "use_colors" or name.endswith("_color")):
+            # as are the line prefixes for each role
+            display._set_colors()
+        config_version += 1
+
+# Bumped on every configuration change; tracked wrappers re-resolve their implementation when it moves
+config_version: int = 0
+
 # Global configuration instance
 tracking_config = TrackingConfig()
 
+# Cached "mode != DISABLED", checked on every tracked call; kept in sync by TrackingConfig.__setattr__
+_ENABLED: bool = tracking_config.mode != TrackingMode.DISABLED
+# Cached "mode == CLI", checked for every displayed event
+_CLI_DISPLAY: bool = tracking_config.mode == TrackingMode.CLI
+
 def set_tracking_mode(mode: TrackingMode):
     """Change the tracking mode"""
     global tracking_config
+    # Also rebinds decorated functions (see TrackingConfig.__setattr__)
     tracking_config.mode = mode
 
 def set_display_level(level: DisplayLevel):
@@ -50,4 +91,4 @@ def set_display_level(level: DisplayLevel):
 
 def is_tracking_enabled() -> bool:
     """Check if tracking is enabled"""
-    return tracking_config.mode != TrackingMode.DISABLED
+    return _ENABLED
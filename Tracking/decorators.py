@@ -1,12 +1,155 @@
 """
 Decorators for tracking agent functions, LLM calls, and API calls.
 """
+import re
+import sys
 import time
+import inspect
+import reprlib
+import weakref
 import functools
-from typing import Callable, Any
+from collections.abc import Mapping
+from typing import Callable, Any, Dict, List, Optional, Tuple
 
-from .events import emit_event, FunctionCallEvent, LLMCallEvent, APICallEvent, ErrorEvent, EventType
-from .config import is_tracking_enabled
+from .events import emit_event, new_event, FunctionCallEvent, LLMCallEvent, APICallEvent, ErrorEvent, EventType
+from . import config as _config
+from .config import is_tracking_enabled, tracking_config, DisplayLevel
+
+# Optional compiled track_function implementation (see _tracking_fast.pyx)
+try:
+    from ._tracking_fast import TrackedFunction as _FastTrackedFunction
+except ImportError:
+    _FastTrackedFunction = None
+
+# Size-capped repr for logged parameters and return values, so large objects
+# (event lists, API responses) are never fully stringified.
+_short_repr = reprlib.Repr()
+_short_repr.maxstring = 80
+_short_repr.maxlist = 8
+
+# Interned "arg_<i>" keys, shared by every logged parameter dict
+_ARG_KEYS = tuple(sys.intern(f"arg_{i}") for i in range(16))
+
+class _LazyParams(Mapping):
+    """
+    A tracked call's parameters, kept by reference and only repr'd when first read
+    (when a verbose CLI line is printed); see _capture_params.
+    """
+    __slots__ = ('args', 'kwargs', '_cached')
+
+    def __init__(self, args: tuple, kwargs: dict):
+        self.args = args
+        self.kwargs = kwargs
+        self._cached = None
+
+    def _materialize(self) -> Dict[str, str]:
+        if self._cached is None:
+            params = {}
+            # Avoids including large objects like 'service'
+            for i, arg in enumerate(self.args):
+                if i > 0: # Skip the 'service' or 'self' object, usually the first arg
+                    key = _ARG_KEYS[i] if i < len(_ARG_KEYS) else f"arg_{i}"
+                    params[key] = _short_repr.repr(arg)
+            for key, value in self.kwargs.items():
+                params[key] = _short_repr.repr(value)
+            self._cached = params
+            # Don't keep the arguments alive once they are serialized
+            self.args = self.kwargs = None
+        return self._cached
+
+    def __getitem__(self, key):
+        return self._materialize()[key]
+
+    def __iter__(self):
+        return iter(self._materialize())
+
+    def __len__(self):
+        return len(self._materialize())
+
+    def __repr__(self):
+        return repr(self._materialize())
+
+    def __deepcopy__(self, memo):
+        # dataclasses.asdict deep-copies fields; serialize instead of copying the arguments
+        return dict(self._materialize())
+
+def _capture_params(args: tuple, kwargs: dict) -> Mapping:
+    """
+    A tracked call's parameters. Left lazy only for inline CLI output, which reads them
+    right away on this thread; the sink's worker thread would otherwise repr the caller's
+    live objects concurrently, so they're serialized here for file, webhook and
+    background output.
+    """
+    params = _LazyParams(args, kwargs)
+    if not _config._CLI_DISPLAY or tracking_config.background_display:
+        params._materialize()
+    return params
+
+# Shared, read-only parameters for calls whose parameters aren't captured. Not a
+# MappingProxyType: asdict() can't deep-copy one when writing file/webhook records.
+# Built already materialized, so reading it from several threads never writes to it.
+_NO_PARAMS = _LazyParams(None, None)
+_NO_PARAMS._cached = {}
+
+# Bound once so tracked calls skip the time module attribute lookup
+_perf_ns = time.perf_counter_ns
+
+# (module name, function name, original, wrapper) for every function decorated with
+# track_function or track_llm, so rebind_all() can swap them when the mode changes
+_TRACKED: List[Tuple[str, str, Callable, Callable]] = []
+
+def _register(func: Callable, wrapper: Callable) -> Callable:
+    """Records a tracked function; returns the raw function while tracking is disabled"""
+    _TRACKED.append((func.__module__, func.__name__, func, wrapper))
+    return wrapper if is_tracking_enabled() else func
+
+def rebind_all():
+    """
+    Points every tracked module-level function at its wrapper when tracking is enabled,
+    or back at the undecorated function when it is disabled, so disabled tracking costs nothing.
+    """
+    enabled = is_tracking_enabled()
+    for module_name, name, original, wrapper in _TRACKED:
+        module = sys.modules.get(module_name)
+        if module is None:
+            continue
+        current = getattr(module, name, None)
+        # Leave names that were rebound to something else alone
+        if current is original or current is wrapper:
+            setattr(module, name, wrapper if enabled else original)
+
+def _verbose_details() -> bool:
+    """Whether function parameters are shown, and so worth capturing"""
+    return tracking_config.show_parameters and tracking_config.display_level == DisplayLevel.VERBOSE
+
+def _verbose_llm() -> bool:
+    """Whether LLM inputs and responses are shown (independent of show_parameters)"""
+    return tracking_config.display_level == DisplayLevel.VERBOSE
+
+def _dispatch(func: Callable, make_impl: Callable[[bool], Callable],
+              is_verbose: Callable[[], bool] = _verbose_details) -> Callable:
+    """
+    Builds the wrapper installed for a tracked function.
+
+    make_impl(verbose) returns an implementation taking (args, kwargs). A fast one (no
+    parameter serialization) and a verbose one are built up front. The wrapper picks
+    between them (using is_verbose()) and the raw function only when config_version changes.
+    """
+    implementations = {False: make_impl(False), True: make_impl(True)}
+    impl = None
+    version = -1
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        nonlocal impl, version
+        if version != _config.config_version:
+            version = _config.config_version
+            impl = implementations[is_verbose()] if is_tracking_enabled() else None
+        if impl is None:
+            return func(*args, **kwargs)
+        return impl(args, kwargs)
+
+    return _register(func, wrapper)
 
 def track_function(func: Callable) -> Callable:
     """
@@ -18,47 +161,111 @@ def track_function(func: Callable) -> Callable:
     - Success or failure (exceptions)
     - Return value
     """
-    @functools.wraps(func)
-    def wrapper(*args, **kwargs):
-        if not is_tracking_enabled():
-            return func(*args, **kwargs)
+    function_name = sys.intern(func.__name__)
 
-        start_time = time.perf_counter()
-        error = None
-        return_value = None
-
-        try:
-            return_value = func(*args, **kwargs)
-            return return_value
-        except Exception as e:
-            error = e
-            # Re-raise the exception after tracking
-            raise
-        finally:
-            end_time = time.perf_counter()
-            execution_time_ms = (end_time - start_time) * 1000
-
-            # Prepare parameters for serialization
-            # Avoids including large objects like 'service'
-            params_to_log = {}
-            for i, arg in enumerate(args):
-                if i > 0: # Skip the 'service' or 'self' object, usually the first arg
-                    params_to_log[f"arg_{i}"] = repr(arg)
-            for key, value in kwargs.items():
-                params_to_log[key] = repr(value)
+    if _FastTrackedFunction is not None:
+        # The compiled wrapper does _dispatch's work itself, so it is installed directly
+        wrapper = _FastTrackedFunction(func, function_name, _verbose_details,
+                                       _capture_params, _NO_PARAMS, _short_repr)
+        functools.update_wrapper(wrapper, func)
+        return _register(func, wrapper)
+
+    def make_impl(verbose: bool) -> Callable:
+        def impl(args, kwargs):
+            start_ns = _perf_ns()
+            error = None
+            return_value = None
+
+            try:
+                return_value = func(*args, **kwargs)
+                return return_value
+            except Exception as e:
+                error = e
+                # Re-raise the exception after tracking
+                raise
+            finally:
+                execution_time_ns = _perf_ns() - start_ns
+
+                # Parameters and the return value are only shown in verbose mode,
+                # so the fast implementation doesn't capture them at all
+                params_to_log = _NO_PARAMS
+                return_value_repr = None
+                if verbose:
+                    params_to_log = _capture_params(args, kwargs)
+                    # Not a truthiness test: that raises for e.g. NumPy arrays and
+                    # can be costly for other containers
+                    if error is None and return_value is not None:
+                        return_value_repr = _short_repr.repr(return_value)
+
+                event = new_event(FunctionCallEvent,
+                    function_name=function_name,
+                    parameters=params_to_log,
+                    execution_time_ns=execution_time_ns,
+                    success=error is None,
+                    return_value=return_value_repr,
+                    error_message=str(error) if error else None
+                )
+                emit_event(event)
+        return impl
+
+    return _dispatch(func, make_impl)
+
+def _arg_getter(func: Callable, name: str, default_index: Optional[int]) -> Callable[[tuple, dict], Any]:
+    """
+    Returns an (args, kwargs) -> value getter for one of func's parameters. The
+    parameter's position is looked up once, falling back to default_index when
+    func's signature doesn't name it. Keyword-only parameters (including any after
+    *args) are only read from kwargs.
+    """
+    try:
+        parameters = inspect.signature(func).parameters
+    except (TypeError, ValueError):
+        parameters = None
+    if parameters is None or name not in parameters:
+        index = default_index
+    else:
+        index = None
+        for i, parameter in enumerate(parameters.values()):
+            if parameter.kind not in (inspect.Parameter.POSITIONAL_ONLY,
+                                      inspect.Parameter.POSITIONAL_OR_KEYWORD):
+                break
+            if parameter.name == name:
+                index = i
+                break
+    if index is None:
+        return lambda args, kwargs: kwargs.get(name)
+    return lambda args, kwargs: args[index] if len(args) > index else kwargs.get(name)
+
+# Runs of non-whitespace, counted as tokens when fast_token_estimate is off
+_WORDS = re.compile(r'\S+')
 
+def _estimate_tokens(text: Optional[str]) -> int:
+    """Rough token count for cost estimates"""
+    if not text:
+        return 0
+    if tracking_config.fast_token_estimate:
+        # ~4 characters per token, without scanning the text
+        return len(text) // 4
+    return sum(1 for _ in _WORDS.finditer(text))
 
-            event = FunctionCallEvent(
-                function_name=func.__name__,
-                parameters=params_to_log,
-                execution_time_ms=execution_time_ms,
-                success=error is None,
-                return_value=repr(return_value) if return_value else None,
-                error_message=str(error) if error else None
-            )
-            emit_event(event)
+# Short model name per model object, so it isn't re-derived on every call
+_model_names: "weakref.WeakKeyDictionary[Any, str]" = weakref.WeakKeyDictionary()
 
-    return wrapper
+def _model_name(model_obj: Any) -> str:
+    """The model's name without its 'models/' path prefix"""
+    if not model_obj:
+        return 'unknown_model'
+    try:
+        return _model_names[model_obj]
+    except (KeyError, TypeError):
+        pass
+    name = sys.intern(getattr(model_obj, 'model_name', 'unknown_model').split('/')[-1]) # Clean up model name
+    try:
+        _model_names[model_obj] = name
+    except TypeError:
+        # Not weak-referenceable or hashable; just don't cache it
+        pass
+    return name
 
 def track_llm(func: Callable) -> Callable:
     """
@@ -68,59 +275,59 @@ def track_llm(func: Callable) -> Callable:
     a response object that has a `.text` attribute and potentially
     token usage information.
     """
-    @functools.wraps(func)
-    def wrapper(*args, **kwargs):
-        if not is_tracking_enabled():
-            return func(*args, **kwargs)
+    # Extract model and prompt from arguments, by position as declared in func's signature
+    # Without such parameters, 'model' is assumed to be the second positional argument
+    # and 'prompt' the third
+    get_prompt = _arg_getter(func, 'prompt', 2)
+    get_model = _arg_getter(func, 'model', 1)
+    get_user_input = _arg_getter(func, 'user_input', None)
+
+    def make_impl(verbose: bool) -> Callable:
+        def impl(args, kwargs):
+            prompt = get_prompt(args, kwargs)
+            model_name = _model_name(get_model(args, kwargs))
+
+            start_ns = _perf_ns()
+            error = None
+            response = None
+
+            try:
+                response = func(*args, **kwargs)
+                return response
+            except Exception as e:
+                error = e
+                raise
+            finally:
+                response_time_ns = _perf_ns() - start_ns
+
+                # Estimate token usage and cost (simplified)
+                # A more accurate method would use the API response's usage metadata
+                llm_response_text = getattr(response, 'text', '') if response else ''
+                prompt_tokens = _estimate_tokens(prompt)
+                response_tokens = _estimate_tokens(llm_response_text)
+                total_tokens = prompt_tokens + response_tokens
+
+                # Simplified cost for Gemini Flash model: ~$0.0001 per 1K tokens
+                estimated_cost = (total_tokens / 1000) * 0.0001
+
+                event = new_event(LLMCallEvent,
+                    event_type=EventType.LLM_CALL,
+                    model_name=model_name,
+                    prompt_length=len(prompt) if prompt else 0,
+                    response_length=len(llm_response_text),
+                    tokens_used=total_tokens,
+                    estimated_cost=estimated_cost,
+                    response_time_ns=response_time_ns,
+                    success=error is None,
+                    # The texts are only shown in verbose mode
+                    user_input=get_user_input(args, kwargs) if verbose else None,
+                    llm_response=llm_response_text if verbose else None,
+                    error_message=str(error) if error else None
+                )
+                emit_event(event)
+        return impl
 
-        # Extract model and prompt from arguments
-        # Assumes 'model' is a keyword argument or the second positional argument
-        # Assumes 'prompt' is a keyword argument or the third positional argument
-        prompt = kwargs.get('prompt', args[2] if len(args) > 2 else None)
-        model_obj = kwargs.get('model', args[1] if len(args) > 1 else None)
-        model_name = getattr(model_obj, 'model_name', 'unknown_model') if model_obj else 'unknown_model'
-        user_input = kwargs.get('user_input', None)
-
-        start_time = time.perf_counter()
-        error = None
-        response = None
-
-        try:
-            response = func(*args, **kwargs)
-            return response
-        except Exception as e:
-            error = e
-            raise
-        finally:
-            end_time = time.perf_counter()
-            response_time_ms = (end_time - start_time) * 1000
-
-            # Estimate token usage and cost (simplified)
-            # A more accurate method would use the API response's usage metadata
-            llm_response_text = getattr(response, 'text', '') if response else ''
-            prompt_tokens = len(prompt.split()) if prompt else 0
-            response_tokens = len(llm_response_text.split())
-            total_tokens = prompt_tokens + response_tokens
-
-            # Simplified cost for Gemini Flash model: ~$0.0001 per 1K tokens
-            estimated_cost = (total_tokens / 1000) * 0.0001
-
-            event = LLMCallEvent(
-                event_type=EventType.LLM_CALL,
-                model_name=model_name.split('/')[-1], # Clean up model name
-                prompt_length=len(prompt) if prompt else 0,
-                response_length=len(llm_response_text),
-                tokens_used=total_tokens,
-                estimated_cost=estimated_cost,
-                response_time_ms=response_time_ms,
-                success=error is None,
-                user_input=user_input,
-                llm_response=llm_response_text,
-                error_message=str(error) if error else None
-            )
-            emit_event(event)
-
-    return wrapper
+    return _dispatch(func, make_impl, _verbose_llm)
 
 def track_api(api_name: str, endpoint: str):
     """
@@ -130,13 +337,17 @@ def track_api(api_name: str, endpoint: str):
         api_name: The name of the API being called (e.g., 'google_calendar').
         endpoint: The specific endpoint being hit (e.g., 'events.list').
     """
+    # Every event for this API/endpoint shares one copy of the names
+    api_name = sys.intern(api_name)
+    endpoint = sys.intern(endpoint)
+
     def decorator(func: Callable) -> Callable:
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
             if not is_tracking_enabled():
                 return func(*args, **kwargs)
 
-            start_time = time.perf_counter()
+            start_ns = _perf_ns()
             error = None
             result = None
             status_code = 200 # Assume success unless an error occurs
@@ -150,15 +361,14 @@ def track_api(api_name: str, endpoint: str):
                 status_code = getattr(e, 'resp', {}).get('status', 500)
                 raise
             finally:
-                end_time = time.perf_counter()
-                response_time_ms = (end_time - start_time) * 1000
+                response_time_ns = _perf_ns() - start_ns
 
-                event = APICallEvent(
+                event = new_event(APICallEvent,
                     event_type=EventType.API_CALL,
                     api_name=api_name,
                     endpoint=endpoint,
                     method="EXECUTE", # Google API client uses .execute()
-                    response_time_ms=response_time_ms,
+                    response_time_ns=response_time_ns,
                     status_code=status_code,
                     success=error is None,
                     error_message=str(error) if error else None
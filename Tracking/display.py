@@ -1,9 +1,11 @@
 """
 CLI display system for tracking events
 """
+import sys
 import json
-from datetime import datetime
-from typing import Dict, Any
+import time
+from typing import Dict, Any, List
+from . import config as _config
 from .config import tracking_config, DisplayLevel, TrackingMode, is_tracking_enabled
 from .events import BaseEvent, EventType, SessionEvent, FunctionCallEvent, LLMCallEvent, APICallEvent, ErrorEvent
 
@@ -26,28 +28,59 @@ class Colors:
     BG_RED = '\033[41m'
     BG_GREEN = '\033[42m'
 
+# ANSI prefix for each color name, built once instead of on every colorize() call
+_COLOR_PREFIXES = {
+    'red': Colors.RED,
+    'green': Colors.GREEN,
+    'yellow': Colors.YELLOW,
+    'blue': Colors.BLUE,
+    'magenta': Colors.MAGENTA,
+    'cyan': Colors.CYAN,
+    'white': Colors.WHITE
+}
+
+def _color_prefix(color: str) -> str:
+    """ANSI prefix for a color name; unknown names just reset"""
+    prefix = _COLOR_PREFIXES.get(color)
+    if prefix is None:
+        prefix = _COLOR_PREFIXES.get(color.lower(), Colors.RESET)
+    return prefix
+
 def colorize(text: str, color: str) -> str:
     """Add color to text if colors are enabled"""
     if not tracking_config.use_colors:
         return text
-    
-    color_map = {
-        'red': Colors.RED,
-        'green': Colors.GREEN,
-        'yellow': Colors.YELLOW,
-        'blue': Colors.BLUE,
-        'magenta': Colors.MAGENTA,
-        'cyan': Colors.CYAN,
-        'white': Colors.WHITE
-    }
-    
-    color_code = color_map.get(color.lower(), Colors.RESET)
-    return f"{color_code}{text}{Colors.RESET}"
-
-def format_timestamp(timestamp: datetime) -> str:
-    """Format timestamp for display"""
+    return _color_prefix(color) + text + Colors.RESET
+
+# (prefix, suffix) around each output line for every role, resolved by _set_colors()
+# whenever use_colors or a *_color setting changes, so formatters do no color lookups
+_SESSION = _FUNCTION = _LLM = _API = _ERROR = ("", "\n")
+
+def _set_colors():
+    """Resolves the line prefix and suffix for each role from tracking_config"""
+    global _SESSION, _FUNCTION, _LLM, _API, _ERROR
+
+    def style(color: str) -> tuple:
+        if not tracking_config.use_colors:
+            return ("", "\n")
+        return (_color_prefix(color), Colors.RESET + "\n")
+
+    _SESSION = style(tracking_config.session_color)
+    _FUNCTION = style(tracking_config.function_color)
+    _LLM = style(tracking_config.llm_color)
+    _API = style(tracking_config.api_color)
+    _ERROR = style(tracking_config.error_color)
+
+_set_colors()
+
+def _line(message: str, style: tuple) -> str:
+    """One output line with a role's (prefix, suffix)"""
+    return style[0] + message + style[1]
+
+def format_timestamp(timestamp_ns: int) -> str:
+    """Format an event's timestamp_ns for display"""
     if tracking_config.show_timestamps:
-        return f"[{timestamp.strftime('%H:%M:%S')}] "
+        return time.strftime('[%H:%M:%S] ', time.localtime(timestamp_ns // 1_000_000_000))
     return ""
 
 def format_execution_time(time_ms: float) -> str:
@@ -56,159 +89,203 @@ def format_execution_time(time_ms: float) -> str:
         return ""
     return f" ({time_ms:.1f}ms)"
 
-def display_session_event(event: SessionEvent):
-    """Display session start/end events"""
-    timestamp = format_timestamp(event.timestamp)
+def format_session_event(event: SessionEvent) -> str:
+    """Format session start/end events for display"""
+    timestamp = format_timestamp(event.timestamp_ns)
     
     if event.event_type == EventType.SESSION_START:
-        message = f"{timestamp}🚀 Session Started"
         if tracking_config.display_level == DisplayLevel.VERBOSE:
-            message += f" | ID: {event.session_id[:8]}"
-        print(colorize(message, tracking_config.session_color))
+            message = f"{timestamp}🚀 Session Started | ID: {event.session_id[:8]}"
+        else:
+            message = f"{timestamp}🚀 Session Started"
+        return _line(message, _SESSION)
         
     elif event.event_type == EventType.SESSION_END:
         message = f"{timestamp}🏁 Session Ended"
-        print(colorize(message, tracking_config.session_color))
+        return _line(message, _SESSION)
+    
+    return ""
 
-def display_function_event(event: FunctionCallEvent):
-    """Display function call events"""
+def format_function_event(event: FunctionCallEvent) -> str:
+    """Format function call events for display"""
     if tracking_config.display_level == DisplayLevel.QUIET:
-        return
+        return ""
         
-    timestamp = format_timestamp(event.timestamp)
+    timestamp = format_timestamp(event.timestamp_ns)
     exec_time = format_execution_time(event.execution_time_ms)
     
     # Success/failure indicator
     status = "✅" if event.success else "❌"
     
-    message = f"{timestamp}{status} {event.function_name}(){exec_time}"
+    # Message pieces, joined once at the end
+    parts = [timestamp, status, " ", event.function_name, "()", exec_time]
     
     # Add parameters if enabled and verbose mode
     if (tracking_config.show_parameters and 
         tracking_config.display_level == DisplayLevel.VERBOSE and 
         event.parameters):
-        params_str = ", ".join([f"{k}={repr(v)[:50]}" for k, v in event.parameters.items()])
-        message += f" | Params: {params_str}"
+        parts.append(" | Params: ")
+        parts.append(", ".join([f"{k}={repr(v)[:50]}" for k, v in event.parameters.items()]))
     
     # Add error message if failed
     if not event.success and event.error_message:
-        message += f" | Error: {event.error_message}"
+        parts.append(f" | Error: {event.error_message}")
     
-    color = tracking_config.function_color if event.success else tracking_config.error_color
-    print(colorize(message, color))
+    return _line("".join(parts), _FUNCTION if event.success else _ERROR)
 
-def display_llm_event(event: LLMCallEvent):
-    """Display LLM call events"""
+def format_llm_event(event: LLMCallEvent) -> str:
+    """Format LLM call events for display"""
     if tracking_config.display_level == DisplayLevel.QUIET:
-        return
+        return ""
         
-    timestamp = format_timestamp(event.timestamp)
+    timestamp = format_timestamp(event.timestamp_ns)
     exec_time = format_execution_time(event.response_time_ms)
     
     status = "🤖" if event.success else "❌"
     
-    message = f"{timestamp}{status} LLM Call ({event.model_name}){exec_time}"
+    # Message pieces, joined once at the end
+    parts = [timestamp, status, " LLM Call (", event.model_name, ")", exec_time]
     
     # Add token and cost info
     if event.tokens_used:
-        message += f" | Tokens: {event.tokens_used}"
+        parts.append(f" | Tokens: {event.tokens_used}")
     if event.estimated_cost:
-        message += f" | Cost: ${event.estimated_cost:.4f}"
+        parts.append(f" | Cost: ${event.estimated_cost:.4f}")
     
     # Add user input in verbose mode
     if (tracking_config.display_level == DisplayLevel.VERBOSE and 
         event.user_input):
         user_input_preview = event.user_input[:100] + "..." if len(event.user_input) > 100 else event.user_input
-        message += f" | Input: '{user_input_preview}'"
+        parts.append(f" | Input: '{user_input_preview}'")
     
     # Add error message if failed
     if not event.success and event.error_message:
-        message += f" | Error: {event.error_message}"
+        parts.append(f" | Error: {event.error_message}")
     
-    color = tracking_config.llm_color if event.success else tracking_config.error_color
-    print(colorize(message, color))
+    return _line("".join(parts), _LLM if event.success else _ERROR)
 
-def display_api_event(event: APICallEvent):
-    """Display API call events"""
+def format_api_event(event: APICallEvent) -> str:
+    """Format API call events for display"""
     if tracking_config.display_level == DisplayLevel.QUIET:
-        return
+        return ""
         
-    timestamp = format_timestamp(event.timestamp)
+    timestamp = format_timestamp(event.timestamp_ns)
     exec_time = format_execution_time(event.response_time_ms)
     
     status = "🌐" if event.success else "❌"
     
-    message = f"{timestamp}{status} API Call ({event.api_name}){exec_time}"
+    # Message pieces, joined once at the end
+    parts = [timestamp, status, " API Call (", event.api_name, ")", exec_time]
     
     # Add status code and method
     if event.status_code:
-        message += f" | {event.method} {event.status_code}"
+        parts.append(f" | {event.method} {event.status_code}")
     
     # Add endpoint in verbose mode
     if (tracking_config.display_level == DisplayLevel.VERBOSE and 
         event.endpoint):
-        message += f" | {event.endpoint}"
+        parts.append(" | ")
+        parts.append(event.endpoint)
     
     # Add error message if failed
     if not event.success and event.error_message:
-        message += f" | Error: {event.error_message}"
+        parts.append(f" | Error: {event.error_message}")
     
-    color = tracking_config.api_color if event.success else tracking_config.error_color
-    print(colorize(message, color))
+    return _line("".join(parts), _API if event.success else _ERROR)
 
-def display_error_event(event: ErrorEvent):
-    """Display error events"""
-    timestamp = format_timestamp(event.timestamp)
+def format_error_event(event: ErrorEvent) -> str:
+    """Format error events for display"""
+    timestamp = format_timestamp(event.timestamp_ns)
     
-    message = f"{timestamp}💥 ERROR: {event.error_type}"
     if event.function_name:
-        message += f" in {event.function_name}()"
-    message += f" | {event.error_message}"
+        message = f"{timestamp}💥 ERROR: {event.error_type} in {event.function_name}() | {event.error_message}"
+    else:
+        message = f"{timestamp}💥 ERROR: {event.error_type} | {event.error_message}"
     
-    print(colorize(message, tracking_config.error_color))
+    text = _line(message, _ERROR)
     
     # Show stack trace in verbose mode
     if (tracking_config.display_level == DisplayLevel.VERBOSE and 
         event.stack_trace):
-        print(colorize(f"Stack trace: {event.stack_trace}", tracking_config.error_color))
+        return text + _line(f"Stack trace: {event.stack_trace}", _ERROR)
+    return text
 
-def display_event(event: BaseEvent):
-    """Main function to display any tracking event"""
-    if not is_tracking_enabled() or tracking_config.mode != TrackingMode.CLI:
+# Formatter for each event class. Keyed on the class rather than event_type,
+# since an ErrorEvent's event_type isn't necessarily EventType.ERROR.
+_FORMATTERS = {
+    SessionEvent: format_session_event,
+    FunctionCallEvent: format_function_event,
+    LLMCallEvent: format_llm_event,
+    APICallEvent: format_api_event,
+    ErrorEvent: format_error_event,
+}
+
+def _formatter(event_class: type):
+    """Formatter for an event class not in _FORMATTERS, e.g. a subclass; cached once found"""
+    for base in event_class.__mro__:
+        formatter = _FORMATTERS.get(base)
+        if formatter is not None:
+            _FORMATTERS[event_class] = formatter
+            return formatter
+    return None
+
+def format_event(event: BaseEvent) -> str:
+    """Format any tracking event for display; empty if it isn't shown at this level"""
+    formatter = _FORMATTERS.get(type(event)) or _formatter(type(event))
+    return formatter(event) if formatter else ""
+
+def _show_event(event: BaseEvent):
+    """Writes an event to stdout; the caller has already checked for CLI mode"""
+    text = format_event(event)
+    if text:
+        sys.stdout.write(text)
+
+def _skip_event(event: BaseEvent):
+    """display_event outside CLI mode: nothing is shown"""
+
+# Main function to display any tracking event. Rebound by _set_mode() whenever
+# the tracking mode changes, so it never checks the mode itself.
+display_event = _show_event if _config._CLI_DISPLAY else _skip_event
+
+def _set_mode(mode: TrackingMode):
+    """Points display_event at the implementation for the new tracking mode"""
+    global display_event
+    display_event = _show_event if mode == TrackingMode.CLI else _skip_event
+
+def display_events(events: List[BaseEvent]):
+    """Display several events with a single write to stdout"""
+    if not _config._CLI_DISPLAY:
         return
     
-    if isinstance(event, SessionEvent):
-        display_session_event(event)
-    elif isinstance(event, FunctionCallEvent):
-        display_function_event(event)
-    elif isinstance(event, LLMCallEvent):
-        display_llm_event(event)
-    elif isinstance(event, APICallEvent):
-        display_api_event(event)
-    elif isinstance(event, ErrorEvent):
-        display_error_event(event)
+    text = "".join([format_event(event) for event in events])
+    if text:
+        sys.stdout.write(text)
+        sys.stdout.flush()
 
 def display_session_summary(summary: Dict[str, Any]):
     """Display session summary at the end"""
     if not is_tracking_enabled() or tracking_config.mode != TrackingMode.CLI:
         return
         
-    print("\n" + "="*50)
-    print(colorize("📊 SESSION SUMMARY", tracking_config.session_color))
-    print("="*50)
-    
+    # Built up and written in one go rather than a write per line
+    out = ["\n" + "="*50 + "\n"]
+    out.append(_line("📊 SESSION SUMMARY", _SESSION))
+    out.append("="*50 + "\n")
+
     if summary.get('total_time_seconds'):
-        print(f"⏱️  Duration: {summary['total_time_seconds']:.1f} seconds")
-    
-    print(f"🔧 Function calls: {summary.get('function_calls_count', 0)}")
-    print(f"🤖 LLM calls: {summary.get('llm_calls_count', 0)}")
-    print(f"🌐 API calls: {summary.get('api_calls_count', 0)}")
-    
+        out.append(f"⏱️  Duration: {summary['total_time_seconds']:.1f} seconds\n")
+
+    out.append(f"🔧 Function calls: {summary.get('function_calls_count', 0)}\n")
+    out.append(f"🤖 LLM calls: {summary.get('llm_calls_count', 0)}\n")
+    out.append(f"🌐 API calls: {summary.get('api_calls_count', 0)}\n")
+
     if summary.get('errors_count', 0) > 0:
-        print(colorize(f"💥 Errors: {summary['errors_count']}", tracking_config.error_color))
-    
+        out.append(_line(f"💥 Errors: {summary['errors_count']}", _ERROR))
+
     if summary.get('total_estimated_cost', 0) > 0:
-        cost_color = tracking_config.error_color if summary['total_estimated_cost'] > 0.10 else tracking_config.function_color
-        print(colorize(f"💰 Total estimated cost: ${summary['total_estimated_cost']:.4f}", cost_color))
-    
-    print("="*50 + "\n") 
\ No newline at end of file
+        cost_style = _ERROR if summary['total_estimated_cost'] > 0.10 else _FUNCTION
+        out.append(_line(f"💰 Total estimated cost: ${summary['total_estimated_cost']:.4f}", cost_style))
+
+    out.append("="*50 + "\n\n")
+    sys.stdout.write("".join(out))
+    sys.stdout.flush()
\ No newline at end of file
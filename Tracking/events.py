@@ -1,12 +1,20 @@
 """
 Event data structures for tracking
 """
+import os
+import sys
+import time
 import uuid
+import itertools
+from collections import deque
 from datetime import datetime
 from dataclasses import dataclass, field
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Mapping, Optional, List
 from enum import Enum
 
+from .config import tracking_config, TrackingMode
+from ._sink import enqueue, flush
+
 class EventType(Enum):
     SESSION_START = "session_start"
     SESSION_END = "session_end"
@@ -15,31 +23,54 @@ class EventType(Enum):
     API_CALL = "api_call"
     ERROR = "error"
 
-@dataclass
+# Event ids are a per-process random prefix plus a counter, so events
+# don't each pay for a uuid4 (session ids still use one)
+_event_prefix = uuid.uuid4().hex[:12]
+_event_counter = itertools.count()
+
+def _next_event_id() -> str:
+    """Unique id for a new event"""
+    return f"{_event_prefix}-{next(_event_counter)}"
+
+@dataclass(slots=True)
 class BaseEvent:
     """Base event structure"""
-    event_id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    event_id: str = field(default_factory=_next_event_id)
     session_id: str = ""
-    timestamp: datetime = field(default_factory=datetime.now)
+    # Wall-clock nanoseconds; cheaper to take per event than a datetime
+    timestamp_ns: int = field(default_factory=time.time_ns)
     event_type: EventType = EventType.FUNCTION_CALL
 
-@dataclass
+    @property
+    def timestamp(self) -> datetime:
+        """Local time of the event, built from timestamp_ns"""
+        return datetime.fromtimestamp(self.timestamp_ns / 1_000_000_000)
+
+@dataclass(slots=True)
 class SessionEvent(BaseEvent):
     """Session start/end events"""
     user_id: Optional[str] = None
     agent_version: Optional[str] = None
     
-@dataclass
+@dataclass(slots=True)
 class FunctionCallEvent(BaseEvent):
     """Function call tracking event"""
     function_name: str = ""
-    parameters: Dict[str, Any] = field(default_factory=dict)
-    execution_time_ms: Optional[float] = None
+    # Any mapping; verbose tracking stores parameters that are only repr'd when read
+    parameters: Mapping[str, Any] = field(default_factory=dict)
+    execution_time_ns: Optional[int] = None
     success: bool = True
     return_value: Any = None
     error_message: Optional[str] = None
+
+    @property
+    def execution_time_ms(self) -> Optional[float]:
+        """Execution time in milliseconds, converted from the integer nanoseconds"""
+        if self.execution_time_ns is None:
+            return None
+        return self.execution_time_ns / 1_000_000
     
-@dataclass
+@dataclass(slots=True)
 class LLMCallEvent(BaseEvent):
     """LLM call tracking event"""
     model_name: str = ""
@@ -47,26 +78,40 @@ class LLMCallEvent(BaseEvent):
     response_length: int = 0
     tokens_used: Optional[int] = None
     estimated_cost: Optional[float] = None
-    response_time_ms: Optional[float] = None
+    response_time_ns: Optional[int] = None
     success: bool = True
     user_input: Optional[str] = None
     llm_response: Optional[str] = None
     error_message: Optional[str] = None
 
-@dataclass
+    @property
+    def response_time_ms(self) -> Optional[float]:
+        """Response time in milliseconds, converted from the integer nanoseconds"""
+        if self.response_time_ns is None:
+            return None
+        return self.response_time_ns / 1_000_000
+
+@dataclass(slots=True)
 class APICallEvent(BaseEvent):
     """API call tracking event"""
     api_name: str = ""
     endpoint: str = ""
     method: str = "GET"
-    response_time_ms: Optional[float] = None
+    response_time_ns: Optional[int] = None
     status_code: Optional[int] = None
     success: bool = True
     request_size: Optional[int] = None
     response_size: Optional[int] = None
     error_message: Optional[str] = None
 
-@dataclass
+    @property
+    def response_time_ms(self) -> Optional[float]:
+        """Response time in milliseconds, converted from the integer nanoseconds"""
+        if self.response_time_ns is None:
+            return None
+        return self.response_time_ns / 1_000_000
+
+@dataclass(slots=True)
 class ErrorEvent(BaseEvent):
     """Error tracking event"""
     error_type: str = ""
@@ -75,84 +120,179 @@ class ErrorEvent(BaseEvent):
     function_name: Optional[str] = None
     context: Dict[str, Any] = field(default_factory=dict)
 
+    def __post_init__(self):
+        # Error types repeat across events; share one copy of each name
+        self.error_type = sys.intern(self.error_type)
+
+# Open an implicit session at import, so events emitted before start_session()
+# have one to go to and emit_event never has to check. Set the environment variable
+# TRACKING_AUTO_START_SESSION=0 before importing Tracking to turn this off; events
+# emitted before start_session() then have an empty session_id.
+AUTO_START_SESSION = os.getenv("TRACKING_AUTO_START_SESSION", "1") != "0"
+
+# Event classes built by the decorators and recycled by the event pool. Session events
+# are never recycled; the summary holds on to them.
+_POOLED = (FunctionCallEvent, LLMCallEvent, APICallEvent)
+
 # Global session tracking
 current_session_id: str = ""
-session_events: List[BaseEvent] = []
+# Bounded, so a long session's memory stays flat; the oldest events are evicted first
+session_events: "deque[BaseEvent]" = deque(maxlen=tracking_config.buffer_size)
+
+# Summary counter updated for each event type as events are recorded
+_COUNTER_KEYS = {
+    EventType.FUNCTION_CALL: "function_calls_count",
+    EventType.LLM_CALL: "llm_calls_count",
+    EventType.API_CALL: "api_calls_count",
+    EventType.ERROR: "errors_count",
+}
+
+def _new_stats() -> Dict[str, Any]:
+    """Empty running totals for a session"""
+    return {
+        "function_calls_count": 0,
+        "llm_calls_count": 0,
+        "api_calls_count": 0,
+        "errors_count": 0,
+        "total_estimated_cost": 0,
+        "session_start": None,
+        "session_end": None,
+    }
+
+# Running totals for the current session, so summaries don't rescan the events
+_session_stats: Dict[str, Any] = _new_stats()
+
+# Most recycled events kept per class
+EVENT_POOL_SIZE = 256
+
+class _EventPool:
+    """Free lists of evicted call events, reused by new_event() when reuse_events is on"""
+    __slots__ = ('_free',)
+
+    def __init__(self):
+        self._free: Dict[type, List[BaseEvent]] = {}
+
+    def acquire(self, cls: type, fields: Dict[str, Any]) -> BaseEvent:
+        free = self._free.get(cls)
+        if free:
+            event = free.pop()
+            # Resets every field, including event_id and timestamp_ns
+            event.__init__(**fields)
+            return event
+        return cls(**fields)
+
+    def release(self, event: BaseEvent):
+        free = self._free.setdefault(type(event), [])
+        if len(free) < EVENT_POOL_SIZE:
+            free.append(event)
+
+_event_pool = _EventPool()
+
+def new_event(cls: type, **fields) -> BaseEvent:
+    """Builds a call event, reusing an evicted one when tracking_config.reuse_events is on"""
+    return _event_pool.acquire(cls, fields)
+
+def _record(event: BaseEvent):
+    """Appends an event to the session and updates the running totals"""
+    if session_events and len(session_events) == session_events.maxlen and tracking_config.reuse_events:
+        evicted = session_events[0]
+        # Only call events, and only when nothing else (the sink's queue) may still hold them
+        if (type(evicted) in _POOLED and tracking_config.mode == TrackingMode.CLI and
+                not tracking_config.background_display):
+            _event_pool.release(evicted)
+    session_events.append(event)
+    event_type = event.event_type
+    counter = _COUNTER_KEYS.get(event_type)
+    if counter is not None:
+        _session_stats[counter] += 1
+        if event_type == EventType.LLM_CALL:
+            _session_stats["total_estimated_cost"] += event.estimated_cost or 0
+    elif event_type == EventType.SESSION_START:
+        if _session_stats["session_start"] is None:
+            _session_stats["session_start"] = event
+    elif event_type == EventType.SESSION_END:
+        if _session_stats["session_end"] is None:
+            _session_stats["session_end"] = event
 
 def start_session(user_id: Optional[str] = None) -> str:
     """Start a new tracking session"""
-    global current_session_id, session_events
+    global current_session_id, session_events, _session_stats
     current_session_id = str(uuid.uuid4())
-    session_events = []
+    session_events = deque(maxlen=tracking_config.buffer_size)
+    _session_stats = _new_stats()
     
     event = SessionEvent(
         session_id=current_session_id,
         event_type=EventType.SESSION_START,
         user_id=user_id
     )
-    session_events.append(event)
+    _record(event)
     return current_session_id
 
 def end_session() -> str:
     """End the current tracking session"""
-    global current_session_id, session_events
-    
     event = SessionEvent(
         session_id=current_session_id,
         event_type=EventType.SESSION_END
     )
-    session_events.append(event)
+    _record(event)
     
+    # The id is kept, so the summary still names this session and any later
+    # events stay with it until start_session() is called again
     ended_session = current_session_id
-    current_session_id = ""
+    # Deliver the whole session before the caller prints its summary or exits
+    if (tracking_config.mode in (TrackingMode.FILE, TrackingMode.WEBHOOK) or
+            tracking_config.background_display):
+        flush()
     return ended_session
 
+# display._show_event, imported on first use (display imports this module)
+_display_event = None
+
 def emit_event(event: BaseEvent):
     """Emit a tracking event"""
-    global current_session_id, session_events
-    
-    if not current_session_id:
-        # Auto-start session if not started
-        start_session()
+    global _display_event
     
     event.session_id = current_session_id
-    session_events.append(event)
+    _record(event)
     
-    # Import here to avoid circular imports
-    from .display import display_event
-    display_event(event)
+    if tracking_config.mode == TrackingMode.CLI and not tracking_config.background_display:
+        # Printed inline so tracking lines stay in order with the agent's own output
+        if _display_event is None:
+            # Import here to avoid circular imports
+            from .display import _show_event as _display_event
+        _display_event(event)
+    else:
+        # File, webhook and background CLI output is written by the sink's worker thread
+        enqueue(event)
 
 def get_session_events() -> List[BaseEvent]:
-    """Get all events for the current session"""
-    return session_events.copy()
+    """Get all events for the current session (at most tracking_config.buffer_size of the newest)"""
+    return list(session_events)
 
 def get_session_summary() -> Dict[str, Any]:
     """Get a summary of the current session"""
     if not session_events:
         return {}
     
-    function_calls = [e for e in session_events if e.event_type == EventType.FUNCTION_CALL]
-    llm_calls = [e for e in session_events if e.event_type == EventType.LLM_CALL]
-    api_calls = [e for e in session_events if e.event_type == EventType.API_CALL]
-    errors = [e for e in session_events if e.event_type == EventType.ERROR]
-    
-    session_start = next((e for e in session_events if e.event_type == EventType.SESSION_START), None)
-    session_end = next((e for e in session_events if e.event_type == EventType.SESSION_END), None)
+    session_start = _session_stats["session_start"]
+    session_end = _session_stats["session_end"]
     
     total_time = None
     if session_start and session_end:
-        total_time = (session_end.timestamp - session_start.timestamp).total_seconds()
-    
-    total_cost = sum(e.estimated_cost or 0 for e in llm_calls)
+        total_time = (session_end.timestamp_ns - session_start.timestamp_ns) / 1_000_000_000
     
     return {
         "session_id": current_session_id,
         "total_time_seconds": total_time,
-        "function_calls_count": len(function_calls),
-        "llm_calls_count": len(llm_calls),
-        "api_calls_count": len(api_calls),
-        "errors_count": len(errors),
-        "total_estimated_cost": total_cost,
+        "function_calls_count": _session_stats["function_calls_count"],
+        "llm_calls_count": _session_stats["llm_calls_count"],
+        "api_calls_count": _session_stats["api_calls_count"],
+        "errors_count": _session_stats["errors_count"],
+        "total_estimated_cost": _session_stats["total_estimated_cost"],
         "session_start": session_start.timestamp if session_start else None,
         "session_end": session_end.timestamp if session_end else None
     }
+
+if AUTO_START_SESSION:
+    start_session()
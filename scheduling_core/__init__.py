@@ -0,0 +1,63 @@
+"""
+Shared Google Calendar primitives for the scheduling agents
+"""
+
+from .auth import (
+    SCOPES,
+    get_service,
+    access_token,
+    execute
+)
+
+from .calendar_api import (
+    DATE_FMT,
+    TIME_FMT,
+    DATETIME_FMT,
+    EVENT_FIELDS,
+    LOCAL_TZ,
+    LOCAL_TZ_NAME,
+    parse_datetime,
+    now_iso,
+    localize,
+    format_time,
+    format_datetime,
+    day_bounds,
+    event_bounds,
+    invalidate_days,
+    list_upcoming_events,
+    list_events,
+    list_days,
+    run_batched,
+    insert_event,
+    query_busy,
+    FreeBusyError,
+    free_slots,
+    # The per-day event cache, for callers that need to inspect or clear it.
+    _cache,
+    _cache_lock
+)
+
+from .async_api import (
+    HAS_AIOHTTP,
+    async_list_events,
+    fetch_days,
+    fetch_days_sync
+)
+
+__all__ = [
+    # Auth
+    "SCOPES", "get_service", "access_token", "execute",
+
+    # Formats and timezone
+    "DATE_FMT", "TIME_FMT", "DATETIME_FMT", "EVENT_FIELDS",
+    "LOCAL_TZ", "LOCAL_TZ_NAME", "parse_datetime", "now_iso", "localize",
+    "format_time", "format_datetime",
+
+    # Calendar queries
+    "day_bounds", "event_bounds", "invalidate_days",
+    "list_upcoming_events", "list_events", "list_days", "run_batched",
+    "insert_event", "query_busy", "FreeBusyError", "free_slots",
+
+    # Concurrent reads (aiohttp)
+    "HAS_AIOHTTP", "async_list_events", "fetch_days", "fetch_days_sync"
+]
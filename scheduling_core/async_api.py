@@ -0,0 +1,98 @@
+"""
+Concurrent Calendar reads over aiohttp, used when several days are needed at once
+"""
+import asyncio
+import datetime as dt
+import json
+from typing import Any, Dict, Iterable, List, Optional
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+from .auth import access_token
+from .calendar_api import EVENT_FIELDS, LOCAL_TZ, _cached_days, _store_days, day_bounds
+
+HAS_AIOHTTP = aiohttp is not None
+
+EVENTS_URL = 'https://www.googleapis.com/calendar/v3/calendars/primary/events'
+# Upper bound on simultaneous connections to googleapis.com.
+MAX_CONNECTIONS_PER_HOST = 64
+
+
+async def async_list_events(session: "aiohttp.ClientSession", params: Dict[str, str],
+                            token: str) -> Dict[str, Any]:
+    """Fetches one page of events.list with the given query parameters and access token."""
+    async with session.get(EVENTS_URL, params=params, headers={'Authorization': f'Bearer {token}'}) as response:
+        response.raise_for_status()
+        return await response.json(loads=_loads)
+
+
+async def _list_all_events(session: "aiohttp.ClientSession", params: Dict[str, str],
+                           token: str) -> List[dict]:
+    """Fetches every page of events.list for the given query parameters."""
+    items = []
+    while True:
+        page = await async_list_events(session, params, token)
+        items.extend(page.get('items', []))
+        if not page.get('nextPageToken'):
+            return items
+        params = {**params, 'pageToken': page['nextPageToken']}
+
+
+async def fetch_days(days: Iterable[dt.date], session: Optional["aiohttp.ClientSession"] = None) -> Dict[dt.date, Any]:
+    """
+    Returns each day's events, or the exception raised while fetching that day.
+
+    Every uncached day is requested at the same time, so K days cost about one round
+    trip instead of K. Pass a session to reuse its connections across calls.
+    """
+    days = list(dict.fromkeys(days))
+    today = dt.datetime.now(LOCAL_TZ).date()
+    results: Dict[dt.date, Any] = _cached_days(days, skip=today)
+    missing = [day for day in days if day not in results]
+    if not missing:
+        return {day: results[day] for day in days}
+
+    owns_session = session is None
+    if owns_session:
+        session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit_per_host=MAX_CONNECTIONS_PER_HOST),
+            timeout=aiohttp.ClientTimeout(total=10),
+        )
+    token = access_token()
+    try:
+        responses = await asyncio.gather(*[
+            _list_all_events(session, {
+                'timeMin': day_bounds(day)[0].isoformat(),
+                'timeMax': day_bounds(day)[1].isoformat(),
+                'singleEvents': 'true',
+                'orderBy': 'startTime',
+                'fields': EVENT_FIELDS,
+            }, token)
+            for day in missing
+        ], return_exceptions=True)
+    finally:
+        if owns_session:
+            await session.close()
+
+    fetched = {}
+    for day, response in zip(missing, responses):
+        if isinstance(response, Exception):
+            results[day] = response
+        else:
+            results[day] = fetched[day] = response
+    _store_days(fetched)
+    return {day: results[day] for day in days}
+
+
+def fetch_days_sync(days: Iterable[dt.date]) -> Dict[dt.date, Any]:
+    """Blocking wrapper around fetch_days for synchronous callers such as the CLI agent."""
+    return asyncio.run(fetch_days(days))
@@ -0,0 +1,162 @@
+"""
+Google Calendar authentication, transport and service caching
+"""
+import os
+import threading
+import functools
+import datetime as dt
+from typing import Any, Optional
+
+import google_auth_httplib2
+import httplib2
+import requests
+from google.auth.transport.requests import Request
+from google.oauth2.credentials import Credentials
+from google_auth_oauthlib.flow import InstalledAppFlow
+from googleapiclient.discovery import build
+from googleapiclient.model import JsonModel
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# If modifying these SCOPES, delete the file token.json.
+SCOPES = ['https://www.googleapis.com/auth/calendar']
+
+# Refresh access tokens this long before they expire, so a request never races the expiry.
+TOKEN_REFRESH_BUFFER = dt.timedelta(minutes=5)
+
+
+class _OrjsonModel(JsonModel):
+    """JsonModel that decodes API responses with orjson instead of the stdlib json module."""
+
+    def deserialize(self, content):
+        try:
+            body = orjson.loads(content)
+        except orjson.JSONDecodeError:
+            return super().deserialize(content)
+        if self._data_wrapper and "data" in body:
+            body = body["data"]
+        return body
+
+
+# Falls back to googleapiclient's default JsonModel when orjson isn't installed.
+_RESPONSE_MODEL = _OrjsonModel() if orjson else None
+
+# The authenticated Calendar service is shared by every caller in the process.
+_service = None
+_creds: Optional[Credentials] = None
+# Where get_service() loaded _creds from, so later refreshes are saved back to it.
+_token_path: Optional[str] = None
+_service_lock = threading.Lock()
+# httplib2.Http isn't thread-safe, so each thread keeps its own keep-alive connection.
+_http_local = threading.local()
+# Token refreshes reuse one keep-alive session instead of Request() opening a new one
+# each time; every refresh runs under _service_lock, so the session is never shared.
+_refresh_request = Request(session=requests.Session())
+
+
+@functools.lru_cache(maxsize=1)
+def _read_creds(token_path: str, mtime: float) -> Credentials:
+    """Parses token.json; cached until the file's modification time changes."""
+    return Credentials.from_authorized_user_file(token_path, SCOPES)
+
+
+def _load_creds(token_path: str) -> Optional[Credentials]:
+    """Returns the stored credentials, or None if the user hasn't logged in yet."""
+    try:
+        mtime = os.path.getmtime(token_path)
+    except OSError:
+        return None
+    return _read_creds(token_path, mtime)
+
+
+def _save_creds(creds: Credentials, token_path: str):
+    """Writes the credentials to token.json unless the file already holds exactly them."""
+    creds_json = creds.to_json()
+    try:
+        with open(token_path) as token:
+            if token.read() == creds_json:
+                return
+    except OSError:
+        pass
+    with open(token_path, 'w') as token:
+        token.write(creds_json)
+
+
+def _needs_refresh(creds: Credentials) -> bool:
+    """True if the access token is missing or expires within TOKEN_REFRESH_BUFFER."""
+    if not creds.refresh_token:
+        return False
+    if not creds.token:
+        return True
+    if creds.expiry is None:
+        return False
+    # google-auth keeps expiry as a naive UTC datetime.
+    now = dt.datetime.now(dt.timezone.utc).replace(tzinfo=None)
+    return creds.expiry - now < TOKEN_REFRESH_BUFFER
+
+
+def _authorized_http() -> google_auth_httplib2.AuthorizedHttp:
+    """Returns the calling thread's reusable, authorized HTTP connection."""
+    http = getattr(_http_local, 'http', None)
+    if http is None:
+        http = google_auth_httplib2.AuthorizedHttp(_creds, http=httplib2.Http(timeout=10))
+        _http_local.http = http
+    return http
+
+
+def get_service(token_path: str, credentials_path: str):
+    """
+    Authenticates with the Google Calendar API and returns a cached service object.
+
+    token_path stores the user's access and refresh tokens; credentials_path is the
+    OAuth client file used when the user has to log in again.
+    """
+    global _service, _creds, _token_path
+    with _service_lock:
+        if _service is not None:
+            # Refresh the access token in place so the same service keeps working.
+            if _needs_refresh(_creds):
+                _creds.refresh(_refresh_request)
+                _save_creds(_creds, token_path)
+            return _service
+
+        creds = _load_creds(token_path)
+
+        # If there are no (valid) credentials available, let the user log in.
+        if not creds or not creds.valid or _needs_refresh(creds):
+            if creds and creds.refresh_token:
+                creds.refresh(_refresh_request)
+            else:
+                flow = InstalledAppFlow.from_client_secrets_file(credentials_path, SCOPES)
+                creds = flow.run_local_server(port=0)
+            # Save the credentials for the next run
+            _save_creds(creds, token_path)
+
+        _creds = creds
+        _token_path = token_path
+        # Use the discovery document bundled with google-api-python-client, so building
+        # the service never costs an HTTP round trip.
+        _service = build('calendar', 'v3', http=_authorized_http(), model=_RESPONSE_MODEL,
+                         static_discovery=True, cache_discovery=False)
+        return _service
+
+
+def access_token() -> str:
+    """Returns a valid OAuth access token for direct HTTP calls, refreshing it if needed."""
+    with _service_lock:
+        if _needs_refresh(_creds):
+            _creds.refresh(_refresh_request)
+            _save_creds(_creds, _token_path)
+        return _creds.token
+
+
+def execute(request, endpoint: Optional[str] = None) -> Any:
+    """
+    Executes an API request (or batch) over the calling thread's own connection.
+
+    endpoint is unused here; it lets callers swap in a tracked executor with the same signature.
+    """
+    return request.execute(http=_authorized_http())
@@ -0,0 +1,381 @@
+"""
+Google Calendar queries shared by the scheduling agents
+"""
+import time
+import functools
+import threading
+import datetime as dt
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from zoneinfo import ZoneInfo
+
+from tzlocal import get_localzone_name
+
+from .auth import execute
+
+try:
+    import numpy as np
+except ImportError:
+    # The vectorized free-slot sweep is optional; the pure Python sweep handles everything.
+    np = None
+
+try:
+    from ciso8601 import parse_datetime
+except ImportError:
+    # ciso8601 is a faster C parser; fall back to the stdlib one if it isn't installed.
+    parse_datetime = dt.datetime.fromisoformat
+
+# Executes a request for the given endpoint name; see auth.execute.
+Executor = Callable[[Any, str], Dict[str, Any]]
+Interval = Tuple[dt.datetime, dt.datetime]
+
+# Display formats for event times.
+DATE_FMT = '%Y-%m-%d'
+TIME_FMT = '%I:%M %p'
+DATETIME_FMT = f'{DATE_FMT} {TIME_FMT}'
+
+# Partial-response masks: only request the fields the agents actually read.
+EVENT_FIELDS = 'items(id,summary,start(dateTime,date),end(dateTime,date)),nextPageToken'
+# errors is needed to tell a failed lookup apart from a calendar with no busy time.
+FREEBUSY_FIELDS = 'calendars/primary(busy,errors)'
+
+# The agents never need more free slots than this for one answer.
+MAX_FREE_SLOTS = 20
+
+# Busy lists at least this long go through the NumPy sweep when NumPy is installed;
+# below it, array setup costs more than the Python loop.
+NUMPY_MIN_INTERVALS = 256
+
+# Google rejects batch requests with more than 50 sub-requests.
+MAX_BATCH_SIZE = 50
+
+# Resolve the local timezone once per process instead of on every call. A ZoneInfo
+# keeps DST transitions right for dates other than today; the fixed offset of the
+# system clock is only a fallback when the IANA name can't be resolved.
+try:
+    LOCAL_TZ_NAME = get_localzone_name()
+    LOCAL_TZ = ZoneInfo(LOCAL_TZ_NAME)
+except Exception:
+    LOCAL_TZ_NAME = 'UTC'
+    LOCAL_TZ = dt.datetime.now().astimezone().tzinfo
+
+# Formatted "now" timestamps keyed by whole second; only the last few are kept.
+_now_iso_cache: Dict[int, str] = {}
+
+# Recently fetched events, bucketed by local calendar day:
+# 'YYYY-MM-DD' -> (monotonic fetch time, events overlapping that day).
+EVENT_CACHE_TTL_SECONDS = 30
+_cache: Dict[str, Tuple[float, List[dict]]] = {}
+_cache_lock = threading.Lock()
+# Queries reaching within this many seconds of now always re-fetch today, since
+# that is where events created from other clients show up first.
+LIVE_WINDOW_SECONDS = 60
+
+
+@functools.lru_cache(maxsize=8)
+def _resource(service, name: str):
+    """Returns service.<name>(), built once; the client rebuilds the resource on every call."""
+    return getattr(service, name)()
+
+
+def now_iso() -> str:
+    """Returns the current UTC time in RFC 3339 format, truncated to the second."""
+    t = int(time.time())
+    now = _now_iso_cache.get(t)
+    if now is None:
+        if len(_now_iso_cache) >= 4:
+            _now_iso_cache.clear()
+        now = _now_iso_cache[t] = dt.datetime.fromtimestamp(t, dt.timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+    return now
+
+
+def format_time(value: dt.datetime) -> str:
+    """Formats a time like TIME_FMT ('02:30 PM') with an f-string instead of strftime."""
+    return f"{(value.hour - 1) % 12 + 1:02d}:{value.minute:02d} {'AM' if value.hour < 12 else 'PM'}"
+
+
+def format_datetime(value: dt.datetime) -> str:
+    """Formats a datetime like DATETIME_FMT ('2024-05-01 02:30 PM') without strftime."""
+    return f"{value.year:04d}-{value.month:02d}-{value.day:02d} {format_time(value)}"
+
+
+def localize(value: dt.datetime) -> dt.datetime:
+    """Attaches the local timezone to a naive datetime; aware datetimes are returned as is."""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=LOCAL_TZ)
+    return value
+
+
+def day_bounds(day: dt.date, tz=LOCAL_TZ) -> Interval:
+    """Returns the [start, end) datetimes of a calendar day in the given timezone."""
+    day_start = dt.datetime.combine(day, dt.time.min, tzinfo=tz)
+    return day_start, day_start + dt.timedelta(days=1)
+
+
+def event_bounds(event: dict, tz=LOCAL_TZ) -> Interval:
+    """Returns the start and end of an event as timezone-aware datetimes."""
+    if 'dateTime' in event['start']:
+        return parse_datetime(event['start']['dateTime']), parse_datetime(event['end']['dateTime'])
+    # All-day events only carry dates; the end date is exclusive.
+    return (dt.datetime.combine(dt.date.fromisoformat(event['start']['date']), dt.time.min, tzinfo=tz),
+            dt.datetime.combine(dt.date.fromisoformat(event['end']['date']), dt.time.min, tzinfo=tz))
+
+
+def _live_day(time_min: dt.datetime, time_max: dt.datetime) -> Optional[dt.date]:
+    """Returns today if [time_min, time_max) comes within LIVE_WINDOW_SECONDS of now."""
+    now = dt.datetime.now(LOCAL_TZ)
+    window = dt.timedelta(seconds=LIVE_WINDOW_SECONDS)
+    if time_min <= now + window and time_max >= now - window:
+        return now.date()
+    return None
+
+
+def _cached_days(days: Iterable[dt.date], skip: Optional[dt.date] = None) -> Dict[dt.date, List[dict]]:
+    """Returns the cached events for each of the given days (except skip) that is still fresh."""
+    now = time.monotonic()
+    with _cache_lock:
+        cached = {}
+        for day in days:
+            if day == skip:
+                continue
+            entry = _cache.get(day.isoformat())
+            if entry and now - entry[0] < EVENT_CACHE_TTL_SECONDS:
+                cached[day] = entry[1]
+        return cached
+
+
+def _store_days(day_events: Dict[dt.date, List[dict]]):
+    """Caches the events fetched for each day."""
+    now = time.monotonic()
+    with _cache_lock:
+        for day, events in day_events.items():
+            _cache[day.isoformat()] = (now, events)
+
+
+def invalidate_days(start_time: dt.datetime, end_time: dt.datetime):
+    """Drops cached days overlapping [start_time, end_time] after the calendar changes."""
+    day = start_time.astimezone(LOCAL_TZ).date()
+    last_day = end_time.astimezone(LOCAL_TZ).date()
+    with _cache_lock:
+        while day <= last_day:
+            _cache.pop(day.isoformat(), None)
+            day += dt.timedelta(days=1)
+
+
+def _all_items(service, request, response: Dict[str, Any], executor: Executor) -> List[dict]:
+    """Returns the items of an events.list response plus those of any further pages."""
+    items = response.get('items', [])
+    while response.get('nextPageToken'):
+        request = _resource(service, 'events').list_next(request, response)
+        response = executor(request, "events.list")
+        items.extend(response.get('items', []))
+    return items
+
+
+def list_upcoming_events(service, max_results: int = 10, executor: Executor = execute) -> List[dict]:
+    """Returns the next max_results events from the user's primary calendar."""
+    request = _resource(service, 'events').list(calendarId='primary', timeMin=now_iso(),
+                                                maxResults=max_results, singleEvents=True,
+                                                orderBy='startTime', fields=EVENT_FIELDS)
+    return executor(request, "events.list").get('items', [])
+
+
+def list_events(service, time_min: dt.datetime, time_max: dt.datetime,
+                fields: str = EVENT_FIELDS, executor: Executor = execute) -> List[dict]:
+    """
+    Returns the events overlapping [time_min, time_max), ordered by start time.
+
+    Days already in the cache are reused; only the span of missing days is fetched.
+    Today is always re-fetched when the range reaches within a minute of now.
+    """
+    first_day = time_min.astimezone(LOCAL_TZ).date()
+    # time_max is exclusive, so a range ending at midnight doesn't pull in the next day.
+    last_day = (time_max - dt.timedelta(microseconds=1)).astimezone(LOCAL_TZ).date()
+    days = [first_day + dt.timedelta(days=n) for n in range((last_day - first_day).days + 1)]
+
+    day_events = _cached_days(days, skip=_live_day(time_min, time_max))
+    missing = [day for day in days if day not in day_events]
+    if missing:
+        fetch_days = [missing[0] + dt.timedelta(days=n) for n in range((missing[-1] - missing[0]).days + 1)]
+        request = _resource(service, 'events').list(
+            calendarId='primary',
+            timeMin=day_bounds(fetch_days[0])[0].isoformat(),
+            timeMax=day_bounds(fetch_days[-1])[1].isoformat(),
+            singleEvents=True, orderBy='startTime', fields=fields
+        )
+        # A partial first page must never be cached as the whole day, so follow every page.
+        events = _all_items(service, request, executor(request, "events.list"), executor)
+
+        fetched = {day: [] for day in fetch_days}
+        for event in events:
+            event_start, event_end = event_bounds(event)
+            for day in fetch_days:
+                day_start, day_end = day_bounds(day)
+                if event_start < day_end and event_end > day_start:
+                    fetched[day].append(event)
+        _store_days(fetched)
+        day_events.update(fetched)
+
+    # Stitch the days back together; events spanning several days appear only once.
+    seen = set()
+    result = []
+    for day in days:
+        for event in day_events[day]:
+            key = event.get('id', id(event))
+            if key in seen:
+                continue
+            event_start, event_end = event_bounds(event)
+            if event_start < time_max and event_end > time_min:
+                seen.add(key)
+                result.append(event)
+    return result
+
+
+def run_batched(service, queries: Dict[str, Any], executor: Executor = execute) -> Dict[str, Any]:
+    """
+    Executes {request_id: request} as multipart batch requests of up to MAX_BATCH_SIZE each.
+
+    Returns each request's response, or the exception it raised, keyed by request_id.
+    """
+    results: Dict[str, Any] = {}
+
+    def collect(request_id, response, exception):
+        results[request_id] = exception or response
+
+    items = list(queries.items())
+    for offset in range(0, len(items), MAX_BATCH_SIZE):
+        batch = service.new_batch_http_request(callback=collect)
+        for request_id, request in items[offset:offset + MAX_BATCH_SIZE]:
+            batch.add(request, request_id=request_id)
+        executor(batch, "batch")
+    return results
+
+
+def list_days(service, days: Iterable[dt.date], executor: Executor = execute) -> Dict[dt.date, Any]:
+    """
+    Returns each day's events, or the exception raised while fetching that day.
+
+    Uncached days are fetched with run_batched instead of one round trip per day.
+    """
+    days = list(dict.fromkeys(days))
+    # A whole day always contains now if it is today, so today is never served from the cache.
+    today = dt.datetime.now(LOCAL_TZ).date()
+    results: Dict[dt.date, Any] = _cached_days(days, skip=today)
+    missing = [day for day in days if day not in results]
+
+    if missing:
+        queries = {}
+        for day in missing:
+            time_min, time_max = day_bounds(day)
+            queries[day.isoformat()] = _resource(service, 'events').list(
+                calendarId='primary', timeMin=time_min.isoformat(), timeMax=time_max.isoformat(),
+                singleEvents=True, orderBy='startTime', fields=EVENT_FIELDS
+            )
+        responses = run_batched(service, queries, executor)
+        fetched = {}
+        for day in missing:
+            response = responses.get(day.isoformat(), {})
+            if not isinstance(response, Exception):
+                # The rare day with more than one page fetches the rest on its own.
+                try:
+                    fetched[day] = _all_items(service, queries[day.isoformat()], response, executor)
+                except Exception as e:
+                    response = e
+            results[day] = fetched.get(day, response)
+        _store_days(fetched)
+
+    return {day: results[day] for day in days}
+
+
+def insert_event(service, body: dict, executor: Executor = execute) -> dict:
+    """Creates an event on the primary calendar and drops the cached days it touches."""
+    request = _resource(service, 'events').insert(calendarId='primary', body=body, fields='htmlLink')
+    created_event = executor(request, "events.insert")
+    invalidate_days(parse_datetime(body['start']['dateTime']), parse_datetime(body['end']['dateTime']))
+    return created_event
+
+
+class FreeBusyError(Exception):
+    """The freebusy query returned errors for the calendar instead of its busy time."""
+
+
+def query_busy(service, time_min: dt.datetime, time_max: dt.datetime,
+               executor: Executor = execute) -> List[Interval]:
+    """
+    Returns the busy intervals of the primary calendar from a single freebusy query.
+
+    Raises FreeBusyError when the server reports errors for the calendar; its busy
+    list is then empty even though the time may well be booked.
+    """
+    body = {
+        "timeMin": time_min.isoformat(),
+        "timeMax": time_max.isoformat(),
+        "items": [{"id": "primary"}],
+    }
+    request = _resource(service, 'freebusy').query(body=body, fields=FREEBUSY_FIELDS)
+    calendar = executor(request, "freebusy.query")['calendars']['primary']
+    errors = calendar.get('errors')
+    if errors:
+        reasons = ', '.join(error.get('reason', 'unknown') for error in errors)
+        raise FreeBusyError(f"Could not read free/busy information for the calendar ({reasons})")
+    return [
+        (parse_datetime(interval['start']).astimezone(LOCAL_TZ),
+         parse_datetime(interval['end']).astimezone(LOCAL_TZ))
+        for interval in calendar.get('busy', [])
+    ]
+
+
+def _free_slots_numpy(busy: Sequence[Interval], start_time: dt.datetime, end_time: dt.datetime,
+                      presorted: bool, max_slots: int) -> List[Interval]:
+    """free_slots over int64 microsecond offsets from start_time, without a Python-level sweep."""
+    one_us = dt.timedelta(microseconds=1)
+    starts = np.fromiter(((busy_start - start_time) // one_us for busy_start, _ in busy),
+                         dtype=np.int64, count=len(busy))
+    ends = np.fromiter(((busy_end - start_time) // one_us for _, busy_end in busy),
+                       dtype=np.int64, count=len(busy))
+    if not presorted:
+        order = np.argsort(starts, kind='stable')
+        starts, ends = starts[order], ends[order]
+
+    # booked_until[i] is how far the range is booked before interval i starts.
+    booked_until = np.maximum.accumulate(np.concatenate(([0], ends)))[:-1]
+    range_end = (end_time - start_time) // one_us
+    gaps = np.flatnonzero((starts > booked_until) & (booked_until < range_end))
+
+    slots = [(start_time + dt.timedelta(microseconds=int(booked_until[i])),
+              start_time + dt.timedelta(microseconds=int(starts[i])))
+             for i in gaps[:max_slots]]
+    if len(gaps) >= max_slots:
+        return slots
+    booked = max(int(ends.max()), 0)
+    if booked < range_end:
+        slots.append((start_time + dt.timedelta(microseconds=booked), end_time))
+    return slots
+
+
+def free_slots(busy: Iterable[Interval], start_time: dt.datetime, end_time: dt.datetime,
+               presorted: bool = False, max_slots: int = MAX_FREE_SLOTS) -> List[Interval]:
+    """Returns the gaps between (start, end) busy intervals within [start_time, end_time].
+
+    Intervals are sorted by start (unless presorted) and overlapping ones are coalesced
+    in a single pass. The sweep stops as soon as the range is booked to its end or
+    max_slots gaps were found, so the remaining intervals are never parsed. Long busy
+    lists are swept with NumPy instead when it is installed.
+    """
+    if np is not None and isinstance(busy, Sequence) and len(busy) >= NUMPY_MIN_INTERVALS:
+        return _free_slots_numpy(busy, start_time, end_time, presorted, max_slots)
+
+    slots = []
+    cur_end = start_time
+    for busy_start, busy_end in (busy if presorted else sorted(busy)):
+        if cur_end < busy_start:
+            slots.append((cur_end, busy_start))
+            if len(slots) >= max_slots:
+                return slots
+        cur_end = max(cur_end, busy_end)
+        if cur_end >= end_time:
+            return slots
+
+    if cur_end < end_time:
+        slots.append((cur_end, end_time))
+    return slots
@@ -0,0 +1,67 @@
+"""
+Tests for scheduling_core.calendar_api that need no Google account
+"""
+import random
+import datetime as dt
+
+import pytest
+
+from scheduling_core import calendar_api
+
+needs_numpy = pytest.mark.skipif(calendar_api.np is None, reason="NumPy is not installed")
+
+
+def _random_busy(rng, start_time, count):
+    busy = []
+    for _ in range(count):
+        # Some intervals start before or run past the searched range.
+        begin = start_time + dt.timedelta(minutes=rng.randint(-120, 24 * 60 + 120))
+        busy.append((begin, begin + dt.timedelta(minutes=rng.randint(1, 180))))
+    return busy
+
+
+@needs_numpy
+@pytest.mark.parametrize("seed", range(50))
+@pytest.mark.parametrize("presorted", [False, True])
+@pytest.mark.parametrize("max_slots", [1, 5, calendar_api.MAX_FREE_SLOTS, 10_000])
+def test_numpy_sweep_matches_python(seed, presorted, max_slots):
+    rng = random.Random(seed)
+    start_time = dt.datetime(2025, 1, 6, tzinfo=calendar_api.LOCAL_TZ)
+    end_time = start_time + dt.timedelta(days=1)
+    busy = _random_busy(rng, start_time, rng.randint(1, 600))
+    if presorted:
+        busy.sort()
+
+    expected = calendar_api.free_slots(iter(busy), start_time, end_time,
+                                       presorted=presorted, max_slots=max_slots)
+    actual = calendar_api._free_slots_numpy(busy, start_time, end_time, presorted, max_slots)
+    assert actual == expected
+
+
+class _FreeBusyService:
+    """Stands in for the Calendar service; query() returns the body it was given."""
+
+    def freebusy(self):
+        return self
+
+    def query(self, body, fields):
+        return body
+
+
+def _query_busy(calendar):
+    start_time = dt.datetime(2025, 1, 6, 9, tzinfo=calendar_api.LOCAL_TZ)
+    end_time = start_time + dt.timedelta(hours=8)
+    return calendar_api.query_busy(_FreeBusyService(), start_time, end_time,
+                                   executor=lambda request, endpoint: {"calendars": {"primary": calendar}})
+
+
+def test_query_busy_returns_busy_intervals():
+    busy = _query_busy({"busy": [{"start": "2025-01-06T10:00:00Z", "end": "2025-01-06T11:00:00Z"}]})
+    assert busy == [(dt.datetime(2025, 1, 6, 10, tzinfo=dt.timezone.utc),
+                     dt.datetime(2025, 1, 6, 11, tzinfo=dt.timezone.utc))]
+
+
+def test_query_busy_raises_on_calendar_errors():
+    # A failed lookup comes back with no busy list; it must not read as a free calendar.
+    with pytest.raises(calendar_api.FreeBusyError, match="backendError"):
+        _query_busy({"errors": [{"domain": "global", "reason": "backendError"}]})